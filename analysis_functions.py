@@ -3,8 +3,8 @@ from datetime import date, timedelta, datetime
 
 # Import configurations and helper functions from config.py
 from config import (
-    COMPANY_CONFIGS,
     format_timedelta_to_hms,
+    format_timedelta_series,
     get_effective_rules_for_employee_day
 )
 
@@ -148,16 +148,15 @@ def analyze_unusual_shift_durations(detailed_df: pd.DataFrame, selected_company_
     df['Shift_Duration_Hours'] = df['Total Shift Duration_td'].dt.total_seconds() / 3600.0
 
     anomalies = []
-    
-    default_standard_shift_hours = COMPANY_CONFIGS.get(selected_company_name, {}).get("default_rules", {}).get("standard_shift_hours", 8)
 
-    for index, row in df.iterrows():
-        employee_no = str(row['No.'])
-        source_name = row['Source_Name']
+    # Plain column iterators instead of iterrows, which boxes every row into a Series
+    shift_duration_strings = df.get('Total Shift Duration', pd.Series(None, index=df.index, dtype=object))
+    for employee_no, name, report_date, source_name, shift_duration_str, shift_duration_hours in zip(
+        df['No.'], df['Name'], df['Date'], df['Source_Name'], shift_duration_strings, df['Shift_Duration_Hours']
+    ):
+        employee_no = str(employee_no)
         effective_rules = get_effective_rules_for_employee_day(selected_company_name, employee_no, source_name)
-        standard_shift_hours = effective_rules.get("standard_shift_hours", default_standard_shift_hours)
-
-        shift_duration_hours = row['Shift_Duration_Hours']
+        standard_shift_hours = effective_rules.standard_shift_hours
         
         if shift_duration_hours > 0:
             deviation = ((shift_duration_hours - standard_shift_hours) / standard_shift_hours) * 100
@@ -174,10 +173,10 @@ def analyze_unusual_shift_durations(detailed_df: pd.DataFrame, selected_company_
             if anomaly_type:
                 anomalies.append({
                     'No.': employee_no,
-                    'Name': row['Name'],
-                    'Date': row['Date'].strftime('%Y-%m-%d'),
-                    'Source_Name': row['Source_Name'],
-                    'Shift Duration (HH:MM:SS)': row['Total Shift Duration'],
+                    'Name': name,
+                    'Date': report_date.strftime('%Y-%m-%d'),
+                    'Source_Name': source_name,
+                    'Shift Duration (HH:MM:SS)': shift_duration_str,
                     'Standard Hours': standard_shift_hours,
                     'Deviation (%)': f"{deviation:.2f}%",
                     'Anomaly Type': anomaly_type
@@ -234,13 +233,14 @@ def generate_location_summary(detailed_df: pd.DataFrame) -> pd.DataFrame:
         axis=1
     )
 
-    location_summary['Total Shift Duration (Location)'] = location_summary['Total_Shift_Duration_Location_TD'].apply(format_timedelta_to_hms)
-    location_summary['Total More_T Hours (Location)'] = location_summary['Total_More_T_Location_TD'].apply(format_timedelta_to_hms)
-    location_summary['Total Short_T Hours (Location)'] = location_summary['Total_Short_T_Location_TD'].apply(format_timedelta_to_hms)
+    location_summary['Total Shift Duration (Location)'] = format_timedelta_series(location_summary['Total_Shift_Duration_Location_TD'])
+    location_summary['Total More_T Hours (Location)'] = format_timedelta_series(location_summary['Total_More_T_Location_TD'])
+    location_summary['Total Short_T Hours (Location)'] = format_timedelta_series(location_summary['Total_Short_T_Location_TD'])
 
-    location_summary['Avg Shift Duration Per Employee (Location)'] = location_summary.apply(
-        lambda row: format_timedelta_to_hms(row['Total_Shift_Duration_Location_TD'] / row['Total_Location_Punch_Days']) if row['Total_Location_Punch_Days'] > 0 else '00:00:00',
-        axis=1
+    # Locations without punch days divide by NaN, giving NaT, which formats as '00:00:00'
+    punch_days = location_summary['Total_Location_Punch_Days']
+    location_summary['Avg Shift Duration Per Employee (Location)'] = format_timedelta_series(
+        location_summary['Total_Shift_Duration_Location_TD'] / punch_days.where(punch_days > 0)
     )
 
     location_summary = location_summary[[
@@ -21,8 +21,8 @@ from analysis_functions import (
 from vacation_adjustment import load_vacation_file, apply_vacation_adjustments
 
 # >>> NEW: store operations logic
-from store_ops_logic import fetch_store_ops_from_url, compare_criteria_with_actual
-from config import COMPANY_CONFIGS, format_timedelta_to_hms, STORE_OPS_LINKS
+from store_ops_logic import fetch_all_sheets, compare_criteria_with_actual
+from config import COMPANY_CONFIGS, format_timedelta_to_hms
 
 class AppUI:
     """
@@ -140,6 +140,7 @@ class AppUI:
         st.session_state.download_filename_cache = "Employee_Punch_Reports.xlsx"
         st.session_state.global_min_date_cache = None
         st.session_state.global_max_date_cache = None
+        st.session_state.parsed_workbook_cache = {}
 
 
     def _process_and_cache_reports(
@@ -272,13 +273,14 @@ class AppUI:
                 if "Source_Names" in final_summary.columns:
                     unique_locations = set([loc.strip() for sublist in final_summary["Source_Names"].str.split(",") for loc in sublist if loc.strip()])
                 
+                # Download every linked sheet up front in parallel, then compare sequentially
+                store_ops_sheets = fetch_all_sheets(unique_locations)
                 for loc in unique_locations:
-                    if loc in STORE_OPS_LINKS:
-                        url = STORE_OPS_LINKS[loc]
+                    if loc in store_ops_sheets:
                         if st.session_state.get("debug_mode", False):
-                            st.info(f"DEBUG: Fetching Store Ops Criteria for '{loc}' from URL.")
+                            st.info(f"DEBUG: Fetching Store Ops Criteria for '{loc}' from Google Sheets.")
                         
-                        raw_result = fetch_store_ops_from_url(url)
+                        raw_result = store_ops_sheets[loc]
                         if not raw_result.empty:
                             res = compare_criteria_with_actual(raw_result, detailed_report_df)
                             dis_df = res['discrepancies']
@@ -1,11 +1,24 @@
 import calendar
-from datetime import timedelta # Added this import
+import functools
+import sys
+from dataclasses import dataclass, field
+from types import MappingProxyType
+import numpy as np
 import pandas as pd
 
 # --- COMPANY-SPECIFIC CONFIGURATIONS ---
 # Define rules for each company.
 # Each company can have default rules, location-specific overrides, and employee-specific overrides.
 # calendar module constants (0=Monday, 6=Sunday)
+
+# Shared by the Second Cup 12-hour university sites (one object referenced by each location)
+_SECOND_CUP_12H_FRI_SAT = {
+    "standard_shift_hours": 12,
+    "short_t_threshold_hours": 11,
+    "more_t_start_hours": 13,
+    "weekend_days": [calendar.FRIDAY, calendar.SATURDAY],
+}
+
 COMPANY_CONFIGS = {
     "Al-hadabah times": {
         "default_rules": {
@@ -81,7 +94,6 @@ COMPANY_CONFIGS = {
         "location_rules": {
             "DCO HO": {"weekend_days": [calendar.FRIDAY], "is_rotational_off": False},
             "Warehouse": {"weekend_days": [calendar.FRIDAY], "is_rotational_off": False},
-            # "Fashion SHW": {"weekend_days": [calendar.FRIDAY], "is_rotational_off": True, "rotational_days_off_per_week": 1},
         }
     },
     "Second Cup": { # Added as a top-level company based on provided data
@@ -141,58 +153,22 @@ COMPANY_CONFIGS = {
                 "opening_hours_count": 24,
                 "is_24_hour_location": True
             },
-            # 12-hour locations
-            "Admin Science": {
-                "standard_shift_hours": 12,
-                "short_t_threshold_hours": 11,
-                "more_t_start_hours": 13,
-            },
-            "Life Science": {
-                "standard_shift_hours": 12,
-                "short_t_threshold_hours": 11,
-                "more_t_start_hours": 13,
-            },
-            "College of Science": {
-                "standard_shift_hours": 12,
-                "short_t_threshold_hours": 11,
-                "more_t_start_hours": 13,
-            },
-            "Edu Boys": {
-                "standard_shift_hours": 12,
-                "short_t_threshold_hours": 11,
-                "more_t_start_hours": 13,
-            },
-            "Edu Girls": {
-                "standard_shift_hours": 12,
-                "short_t_threshold_hours": 11,
-                "more_t_start_hours": 13,
-            },
-            "Edu Girls 2": {
-                "standard_shift_hours": 12,
-                "short_t_threshold_hours": 11,
-                "more_t_start_hours": 13,
-            },
+            # 12-hour locations (university sites share one rules object)
+            "Admin Science": _SECOND_CUP_12H_FRI_SAT,
+            "Life Science": _SECOND_CUP_12H_FRI_SAT,
+            "College of Science": _SECOND_CUP_12H_FRI_SAT,
+            "Edu Boys": _SECOND_CUP_12H_FRI_SAT,
+            "Edu Girls": _SECOND_CUP_12H_FRI_SAT,
+            "Edu Girls 2": _SECOND_CUP_12H_FRI_SAT,
             "Marina mall": {
                 "standard_shift_hours": 12,
                 "short_t_threshold_hours": 11,
                 "more_t_start_hours": 13,
                 "weekend_days": [],
             },
-            "Boys PAAET": {
-                "standard_shift_hours": 12,
-                "short_t_threshold_hours": 11,
-                "more_t_start_hours": 13,
-            },
-            "Nursing Girls": {
-                "standard_shift_hours": 12,
-                "short_t_threshold_hours": 11,
-                "more_t_start_hours": 13,
-            },
-            "Nursing Boys": {
-                "standard_shift_hours": 12,
-                "short_t_threshold_hours": 11,
-                "more_t_start_hours": 13,
-            },
+            "Boys PAAET": _SECOND_CUP_12H_FRI_SAT,
+            "Nursing Girls": _SECOND_CUP_12H_FRI_SAT,
+            "Nursing Boys": _SECOND_CUP_12H_FRI_SAT,
             "Makki Juma": {
                 "standard_shift_hours": 12,
                 "short_t_threshold_hours": 11,
@@ -204,33 +180,65 @@ COMPANY_CONFIGS = {
                 "short_t_threshold_hours": 11,
                 "more_t_start_hours": 13,
             },
-            # Locations with Friday and Saturday weekends, inheriting other defaults
-            "Admin Science": {"weekend_days": [calendar.FRIDAY, calendar.SATURDAY]},
-            "Life Science": {"weekend_days": [calendar.FRIDAY, calendar.SATURDAY]},
-            "College of Science": {"weekend_days": [calendar.FRIDAY, calendar.SATURDAY]},
-            "Edu Boys": {"weekend_days": [calendar.FRIDAY, calendar.SATURDAY]},
-            "Edu Girls": {"weekend_days": [calendar.FRIDAY, calendar.SATURDAY]},
-            "Boys PAAET": {"weekend_days": [calendar.FRIDAY, calendar.SATURDAY]},
-            "BEAUTY AND TRAVEL": {"weekend_days": [calendar.FRIDAY, calendar.SATURDAY]},
-            "PAAET Admin": {"weekend_days": [calendar.FRIDAY, calendar.SATURDAY]},
-            "Edu Girls 2": {"weekend_days": [calendar.FRIDAY, calendar.SATURDAY]},
-            "Nursing Girls": {"weekend_days": [calendar.FRIDAY, calendar.SATURDAY]},
-            "Nursing Boys": {"weekend_days": [calendar.FRIDAY, calendar.SATURDAY]},
-            "CIT-SABA SALEM": {"weekend_days": [calendar.FRIDAY, calendar.SATURDAY]},
-            "Police Force": {"weekend_days": [calendar.FRIDAY, calendar.SATURDAY]},
-            "CIT-SABA SALEM": {"weekend_days": [calendar.FRIDAY, calendar.SATURDAY]},
-            "Edu Boys PAAET": {"weekend_days": [calendar.FRIDAY, calendar.SATURDAY]},
-            "Admin Tower PAAET": {"weekend_days": [calendar.FRIDAY, calendar.SATURDAY]},
-            "Capital Governorate": {"weekend_days": [calendar.FRIDAY, calendar.SATURDAY]},
-            "Khaitan": {"weekend_days": [calendar.FRIDAY, calendar.SATURDAY]},
-
-            # "Badriya Hospital": {"weekend_days": [calendar.FRIDAY, calendar.SATURDAY]},
-            
         }
     }
 }
+
+# Second Cup locations whose only rule is a Friday+Saturday weekend, inheriting other defaults.
+# Kept as a list and merged below so a location that is also configured above fails at import:
+# a repeated key in the dict literal would silently keep only its last value.
+_SECOND_CUP_FRI_SAT_LOCATIONS = (
+    "BEAUTY AND TRAVEL",
+    "PAAET Admin",
+    "CIT-SABA SALEM",
+    "Police Force",
+    "Edu Boys PAAET",
+    "Admin Tower PAAET",
+)
+assert len(set(_SECOND_CUP_FRI_SAT_LOCATIONS)) == len(_SECOND_CUP_FRI_SAT_LOCATIONS), \
+    "Duplicate Second Cup Friday+Saturday location"
+_second_cup_location_rules = COMPANY_CONFIGS["Second Cup"]["location_rules"]
+for _source_name in _SECOND_CUP_FRI_SAT_LOCATIONS:
+    assert _source_name not in _second_cup_location_rules, f"Second Cup location configured twice: {_source_name}"
+    _second_cup_location_rules[_source_name] = {"weekend_days": [calendar.FRIDAY, calendar.SATURDAY]}
+del _second_cup_location_rules, _source_name
+
+# Frozen here, before any derived table is built, so OVERRIDES and the rules tables below
+# hold the same read-only layers as COMPANY_CONFIGS rather than the mutable literals.
+def _freeze(value, key=None, _frozen=None):
+    """
+    Read-only deep view of a config literal: dicts become MappingProxyType, weekend_days a frozenset.
+    A dict referenced from several places (e.g. _SECOND_CUP_12H_FRI_SAT) is frozen once and stays shared.
+    """
+    if isinstance(value, dict):
+        if _frozen is None:
+            _frozen = {}
+        if id(value) not in _frozen:
+            _frozen[id(value)] = MappingProxyType({sys.intern(k): _freeze(v, k, _frozen) for k, v in value.items()})
+        return _frozen[id(value)]
+    if key == "weekend_days" and value is not None:
+        return frozenset(value)
+    return value
+
+COMPANY_CONFIGS = _freeze(COMPANY_CONFIGS)
 # --- END COMPANY-SPECIFIC CONFIGURATIONS ---
 
+# Flat view of COMPANY_CONFIGS, keyed by tuples so each rules layer is a single lookup:
+#   (company, "default") / (company, "loc", source_name) / (company, "emp", employee_no)
+_EMPTY_RULES = MappingProxyType({})
+OVERRIDES = {}
+for _company, _cfg in COMPANY_CONFIGS.items():
+    OVERRIDES[(_company, "default")] = _cfg.get("default_rules", _EMPTY_RULES)
+    for _source_name, _rules in _cfg.get("location_rules", {}).items():
+        OVERRIDES[(_company, "loc", sys.intern(_source_name))] = _rules
+    for _employee_no, _rules in _cfg.get("employee_overrides", {}).items():
+        OVERRIDES[(_company, "emp", _employee_no)] = _rules
+del _company, _cfg, _source_name, _employee_no, _rules
+OVERRIDES = MappingProxyType(OVERRIDES)
+# Rules layers are flat {rule: value} mappings, so merging them is a plain dict union
+assert not any(isinstance(v, (dict, MappingProxyType)) for _layer in OVERRIDES.values() for v in _layer.values()), \
+    "Nested dict in a rules layer"
+
 def normalize_employee_id(emp_id) -> str:
     """
     Robustly normalizes employee IDs to a standard string format.
@@ -376,11 +384,41 @@ FILE_DATE_FORMATS = {
     "LVER Al Raya": '%m/%d/%Y %I:%M:%S %p',
     "LVER Mohalab": '%d-%b-%y %I:%M:%S %p',
     "Menbur Avenue": '%m/%d/%Y %I:%M:%S %p',
-    "DCO HO": '%m/%d/%Y %I:%M:%S %p',
     "Hunkemoller Avenue": '%m/%d/%Y %I:%M:%S %p',
 }
 # --- END FILE-SPECIFIC DATE FORMATS ---
 
+# Fallback formats tried, in order, after a source's own FILE_DATE_FORMATS entry
+GENERAL_DATE_FORMATS = (
+    '%d/%m/%Y %I:%M:%S %p', '%d/%m/%Y %I:%M %p',
+    '%d-%b-%y %I:%M:%S %p', '%d-%b-%y %I:%M %p',
+    '%m/%d/%Y %I:%M:%S %p', '%m/%d/%Y %I:%M %p',
+    '%d/%m/%y %I:%M:%S %p', '%d/%m/%y %I:%M %p',
+    '%H:%M:%S', '%H:%M',
+)
+
+# FILE_DATE_FORMATS keyed by lowercased, trimmed Source_Name, so "Spring field" finds "Spring Field".
+# The handful of distinct format strings are interned and shared by every entry.
+_FILE_DATE_FORMATS_CI = {
+    source_name.lower().strip(): sys.intern(fmt) for source_name, fmt in FILE_DATE_FORMATS.items()
+}
+assert len(_FILE_DATE_FORMATS_CI) == len(FILE_DATE_FORMATS), "FILE_DATE_FORMATS keys differ only by case"
+
+@functools.lru_cache(maxsize=512)
+def get_date_format(source_name):
+    """Returns the FILE_DATE_FORMATS entry for a Source_Name (case/whitespace-insensitive), or None."""
+    return _FILE_DATE_FORMATS_CI.get(str(source_name).lower().strip())
+
+@functools.lru_cache(maxsize=256)
+def date_formats_for_source(source_name) -> tuple:
+    """
+    Formats to try, in order, when parsing a file from this source:
+    its own FILE_DATE_FORMATS entry first, then GENERAL_DATE_FORMATS (without repeats).
+    """
+    specific_format = get_date_format(source_name)
+    formats = (specific_format,) + GENERAL_DATE_FORMATS if specific_format else GENERAL_DATE_FORMATS
+    return tuple(dict.fromkeys(formats))
+
 # =====================================================================
 # NUMERIC FILE NAME → LOCATION MAPPING
 # =====================================================================
@@ -511,130 +549,166 @@ LOCATION_MAP = {
     },
 }
 
+# Sources deliberately listed under more than one company in LOCATION_MAP
+# (each company has its own numeric code for them), so they have no single owner.
+SHARED_SOURCE_NAMES = frozenset({"DCO HO", "Jaber Dental"})
+
+# Every company that configures a Source_Name, via LOCATION_MAP or location_rules.
+# Sources such as "HO" and "Warehouse" carry rules in several companies, so this keeps all owners.
+_companies_for_source = {}
+for _company, _locations in LOCATION_MAP.items():
+    for _source_name in _locations:
+        if _source_name not in SHARED_SOURCE_NAMES:
+            assert _source_name not in _companies_for_source, f"Duplicate source in LOCATION_MAP: {_source_name}"
+        _companies_for_source.setdefault(_source_name, []).append(_company)
+for _company, _cfg in COMPANY_CONFIGS.items():
+    for _source_name in _cfg.get("location_rules", {}):
+        if _company not in _companies_for_source.setdefault(_source_name, []):
+            _companies_for_source[_source_name].append(_company)
+COMPANIES_FOR_SOURCE = {src: tuple(owners) for src, owners in _companies_for_source.items()}
+
+# Reverse lookup Source_Name → company, built once at import.
+# Sources with more than one owner map to None.
+SOURCE_TO_COMPANY = {
+    src: owners[0] if len(owners) == 1 else None
+    for src, owners in COMPANIES_FOR_SOURCE.items()
+}
+del _companies_for_source, _company, _locations, _cfg, _source_name
+
+# Leading digit of a numeric file name → company
+COMPANY_BY_DIGIT = {"1": "D&H", "2": "D&co", "3": "Second Cup", "4": "Al-hadabah times"}
+
+# Flat (company, location code) → Source_Name, so a numeric file name resolves in one lookup
+LOCATION_BY_CODE = {
+    (company, code): source_name
+    for company, locations in LOCATION_MAP.items()
+    for source_name, code in locations.items()
+}
+
 # =====================================================================
 # STORE OPERATIONS CRITERIA LINKS (Google Sheets)
 # =====================================================================
-# Maps Source_Name → Google Sheet Export URL
+# Maps Source_Name → (spreadsheet_id, gid); gid None means the first sheet.
+# Build the CSV export URL with sheet_export_url(*STORE_OPS_LINKS[name]).
 # kuwait links 
 STORE_OPS_LINKS = {
-    "Etam Avenue": "https://docs.google.com/spreadsheets/d/153tgWpTT65qOVL_KJpGOMP7xNYmG-Sc5JNNIhcsz490/export?format=csv",
-    "Yammay Avenue": "https://docs.google.com/spreadsheets/d/1O3b842Nvwgb-HIpBZ--cEMfcnlRrKmfJ8HNa0TccF14/export?format=csv",
-    "Ws Gatemall": "https://docs.google.com/spreadsheets/d/15wFd-tdzSr4AtJ9bgmelju0XoAVcCL4EPDeMfqdWkbg/export?format=csv",
-    "Etam Gatemall": "https://docs.google.com/spreadsheets/d/1nKtjIlcPkOH6jPcWAfEDSq9uxA4iap80Bjpch-LHg8Y/export?format=csv",
-    "Ws Mohalab": "https://docs.google.com/spreadsheets/d/1U0bIjdb6MEzlN_i83s86TG6k4Xd64hRlcbm3P7wcs_o/export?format=csv",
-    "TT Mohalab": "https://docs.google.com/spreadsheets/d/1EgrYSYxvcEg0DIuilrQLdutzW-jmKhqyoElZNQshUf8/export?format=csv",
-    "Benetone Mohalab": "https://docs.google.com/spreadsheets/d/1o9tibo9_zlmbwBB4VKAiJK6sabGkhCK_hOyeHWl2xi8/export?format=csv",
-    "Ws Sharq": "https://docs.google.com/spreadsheets/d/1gNTn5xfVIH8mY8-BWabPAAemoQGzO27Yf3__5OgNXhY/export?format=csv",
-    "Ws Koutmall": "https://docs.google.com/spreadsheets/d/167dhfW8-4M7Z-T9gtat6MgNuIT1iOiNdSO8WGKktNDY/export?format=csv",
-    "Yammay Al koutmall": "https://docs.google.com/spreadsheets/d/1rxxfgnrlQMr9OaKOIOwYlL-ZN5FXbXat1i3F_9w9HQQ/export?format=csv",
-    "Etam Marina": "https://docs.google.com/spreadsheets/d/1tk1fWxxNGmWKpK3kSqI01JFGd7AlUNZeImZcjOMXJpc/export?format=csv",
-    "Celio Marina": "https://docs.google.com/spreadsheets/d/1hahRBpfD02oLKcxsvdDSZVEhkMT4YeAz1dg3dj6e24c/export?format=csv",
-    "Etam Warehouse": "https://docs.google.com/spreadsheets/d/1xScMArE5q7w7iU8phhY_y1l_B9SIO1oEC0MUmtyBTRg/export?format=csv",
-    "Celio Warehouse": "https://docs.google.com/spreadsheets/d/1Tz96_oel75cno1kdRUmhRqBhGkcBsMit-kxxOLEg5_Q/export?format=csv",
-    "Spring Field": "https://docs.google.com/spreadsheets/d/1aKR_nleV4eO9TJNHv0a8BXKutCBY_CeuJLIATXcoyB4/export?format=csv",
-    "Designer Avenue": "https://docs.google.com/spreadsheets/d/1QvEUOisRktU33zhWcCxhq39F2MlN72GM-D6wjZPrhyI/export?format=csv",
-    "D&H Warehouse": "https://docs.google.com/spreadsheets/d/1nA5qlW2MA9gp39OLZqO4Y9B4oAbvifJHuFIOYjk7eCI/export?format=csv",
-    "S21": "https://docs.google.com/spreadsheets/d/1O8y7iuTZ-6jzsz_UJgflHsnolspSCIlTccHnQ3SiuJw/export?format=csv",
-    "Doha Store Warehouse": "https://docs.google.com/spreadsheets/d/1VeApY8r7bVXcgOu6-J5toKbASNSRtHQdJWozNsYu0hI/export?format=csv",
-    "Doha Store": "https://docs.google.com/spreadsheets/d/1dWE2NyI2bRS-k2uzDNBH7zYVYI4yOsDnCr7HaGtkqqI/export?format=csv",
-    "S17": "https://docs.google.com/spreadsheets/d/1Lua5oVoPAeO9rccEmmX8L8a6b418xDe-6r_AyBf_dPg/export?format=csv",
-    "S41": "https://docs.google.com/spreadsheets/d/1JbhsFZWPZgxXVe4-PlqeqUZFy5k8bufHE1SD_STStTI/export?format=csv",
-    "S33": "https://docs.google.com/spreadsheets/d/1s0vTurRXOK8lwrnoXNDnpF8G1BDm4svvxSr7osGQbWk/export?format=csv",
-    "Hadaba HO": "https://docs.google.com/spreadsheets/d/1jtCTBHnHmdQX8cMTYOL7Dj-kuX0nkKzGNgp0SmnTOnA/export?format=csv",
-    "Hunkemoller Avenue": "https://docs.google.com/spreadsheets/d/1YZiP-0bltMIOnGEq1oSuMulcpVzM5PL_NM13dFhuqK8/export?format=csv",
-    "S40": "https://docs.google.com/spreadsheets/d/1QtWsNwKm6ChnoLhw368jrpXX6B-xbWSZnscQ0E6ea0c/export?format=csv",
-    "Hawally Warehouse ( Hadabah )": "https://docs.google.com/spreadsheets/d/1easCQaB098EO1_rw0sKuNf6SXDLvSbE4D0RoiCUH-y4/export?format=csv",
-    "Al hadabah Drivers": "https://docs.google.com/spreadsheets/d/1OH0ko6btNzsqBXKP65sDzOXwbjM-DMLcdK9_1Sjphpo/export?format=csv",
-    "Lighting Plus": "https://docs.google.com/spreadsheets/d/1XuqWn1ExRllisPEMVD-l0noo1_5yjADi6qxP02tmSLA/export?format=csv",
-    "S39": "https://docs.google.com/spreadsheets/d/1Fp5aOxXDLlNHr2Mxw5CCdqyE231CJHha1qg92ca9Q6U/export?format=csv",
-    "S16": "https://docs.google.com/spreadsheets/d/1_rYcZoqKXw8VAyX91CJFHe7oOC1OM2PfBrW9qucg7z4/export?format=csv",
-    "S14": "https://docs.google.com/spreadsheets/d/16oQHWV6zYhJlEISQcibTFbU4RtJGug6lwjHJpsnfiuc/export?format=csv",
-    "S20": "https://docs.google.com/spreadsheets/d/1JtsMMCU79bFQhEwq4cUFDOsVSv9obJRS1dSDeIucqDQ/export?format=csv",
-    "S42": "https://docs.google.com/spreadsheets/d/1gwm11GBN7KhBh4xf93-0JQfY42bfKXd0wH7kGCznKwk/export?format=csv",
-    "brand managers": "https://docs.google.com/spreadsheets/d/1zIzNvg62fu3aiSorYuQHyd6QeY_HeyPKWrTYxeUCqhk/export?format=csv",
-    "floor managers": "https://docs.google.com/spreadsheets/d/1zR79LssZ8FkZtkYUTPmacVookCtmZCYb5VPhZHnruTE/export?format=csv",
-    "Warehouse": "https://docs.google.com/spreadsheets/d/1opWFJv14RyvOAafIzJu9d1b60AkGOkCQvcFlAT9chkc/export?format=csv",
-    "Marina Mall": "https://docs.google.com/spreadsheets/d/1CKG2tYMLC6qDY4Z1I43rR63FaFydTJBQNRyaB26NeEw/export?format=csv",
-    "Bustan": "https://docs.google.com/spreadsheets/d/192g5jq4CbRo30kmgUUimk8_yAPOywkTWXgG4s6zI5nk/export?format=csv",
-    "DASHCO": "https://docs.google.com/spreadsheets/d/1D8mffrtNGvY_wnt8jJCpUmJClN-xmqlSGdeu2e-iwqY/export?format=csv",
-    "Admin Science": "https://docs.google.com/spreadsheets/d/1RYDX-jPNeB52VAC5ovv6hXBWlXe1etihLvx544aT3l4/export?format=csv",
-    "Life Science": "https://docs.google.com/spreadsheets/d/1-H2NJDF1L-6DRXJNbOPTh-x9Xi9FCE0_OBrC6YkO4zQ/export?format=csv",
-    "International Hospital": "https://docs.google.com/spreadsheets/d/14IUbRRpsnO6s_rWgOqA3GgRYR71x6b9m_iYtO-pNGKo/export?format=csv",
-    "Mohalab": "https://docs.google.com/spreadsheets/d/19dtrtH6kCLp_etG6dva03anTIiLYtHlqivdF37MoV44/export?format=csv",
-    "College of Science": "https://docs.google.com/spreadsheets/d/1JWALXVWWm5e0B9GA-dW_PMNHVK5Y94FIxjVwiNNLo8c/export?format=csv",
-    "Makki Juma": "https://docs.google.com/spreadsheets/d/1v47A4y1Ys6I_F1927ymABuqxQaI0tV3-V1-B_F92xk4/export?format=csv",
-    "Police Force": "https://docs.google.com/spreadsheets/d/1fXSAmk0MZwIIbZf2-xbgs5804eFcIOGFanNdny5sIy4/export?format=csv",
-    "Jahar Hospital": "https://docs.google.com/spreadsheets/d/1ud8koWY2v7_c5T4y--6Slrtn8UxE2GN_VvSt23DmOsU/export?format=csv",
-    "Farwaniya Hospital": "https://docs.google.com/spreadsheets/d/1-NyjZgwaWv1bvpF5PUz_1Izw2dRgZ48v7BgGfe1f6xQ/export?format=csv",
-    "Jaber Hospital": "https://docs.google.com/spreadsheets/d/1iy6pgd7CiXZR8Lau7dvd7gtpVHq-chq1TDi7MBaWnsQ/export?format=csv",
-    "Badriya Hospital": "https://docs.google.com/spreadsheets/d/1wurL9jUXypUObHwgjRotBd22-QdwJ3wEAPfJ0hKytNg/export?format=csv",
-    "BEAUTY AND TRAVEL": "https://docs.google.com/spreadsheets/d/1VWbNLzKgcfxUQx1YLttiAyf3_s5ITzVfuOVcD_vaOio/export?format=csv",
-    "CIT": "https://docs.google.com/spreadsheets/d/1F4sSTHjLn4F-UHGVXBWc-x9mxcllYs1r8j2LG_tiu8g/export?format=csv",
-    "Nursing Boys": "https://docs.google.com/spreadsheets/d/1xVGaeF6QO-EaE3tnaFkgQzGN1SXYNIWO8W8xWIImjp4/export?format=csv",
-    "Nursing Girls": "https://docs.google.com/spreadsheets/d/1MRWfpWMOhmyAP7k8oT9m5Tw6ikYhW_fNEVgula-3GOs/export?format=csv",
-    "Edu Boys": "https://docs.google.com/spreadsheets/d/19HGjc334GKdgFr3ACMEyNvlUjgJgP0mOiMO_-YyskZc/export?format=csv",
-    "Edu Boys PAAET": "https://docs.google.com/spreadsheets/d/1ydEouRS6QJmbhmmnC_tZUWhEdy5ghuxOsVTN8DKNZxs/export?format=csv",
-    "Edu Girls": "https://docs.google.com/spreadsheets/d/1kQzTAw_TopvmP5QL7E9initiF_xTXdPkC9LnKME5nyI/export?format=csv",
-    "Edu Girls 2": "https://docs.google.com/spreadsheets/d/1ruvMegtyC9QmOz4hK4RulS0HqJmcNpBZ5UKev4VBVvw/export?format=csv",
-    "PAAET Admin": "https://docs.google.com/spreadsheets/d/19nFvunZ4GLbb9VZ_bmj_lvI_5N4wxC6lSr5TO3nx5pM/export?format=csv",
-    "Khaitan": "https://docs.google.com/spreadsheets/d/1JsqzNF_M3aj_Tg7G6P_AkWjWrPUjTHjqoOdnCz62Wdc/export?format=csv",
-    "Capital Governorate": "https://docs.google.com/spreadsheets/d/1L1KoxiAMxvn13zpW6hvISFhWdFqo_WkFnets58yRiyE/export?format=csv",
-    "Adan Hospital": "https://docs.google.com/spreadsheets/d/1XNj1Tdr2k-JBFpj0Qod-AjEVpyVuj-t8jItVAyHl9Cw/export?format=csv",
-    "JABER DENTAL": "https://docs.google.com/spreadsheets/d/1Sjlx0i7nIExBNiuewu5CFG35sLj5tfZ0SO3gsTcCEh0/export?format=csv",
-    "2nd cup Warehouse": "https://docs.google.com/spreadsheets/d/1uRNl-KdUHtWx2NGVnI0tUcKx_qshwag-llvW5NKougE/export?format=csv",
-    "Ws Olympia": "https://docs.google.com/spreadsheets/d/1i1T6ED5n_JnMzwWzl4XqP1He3XtGe4ubei0IPv7IRtg/export?format=csv",
-    "Ws 360": "https://docs.google.com/spreadsheets/d/1jF2SHpPS0lEvG-nxz7TLRfrU-X2yqhTbwvBiL2NYL_c/export?format=csv",
-    "Etam 360": "https://docs.google.com/spreadsheets/d/1o8QTsay4QYeQ_CPlh3xvkY99He1G8aF4VlnQRZEBIYw/export?format=csv",
-    "Ws Avenue": "https://docs.google.com/spreadsheets/d/1xlIeoD_CU5l6-wHr8Nuc5ASoUlxmtg2Tfj32Yvcc00Y/export?format=csv",
-    "LVER 360": "https://docs.google.com/spreadsheets/d/1O8y7iuTZ-6jzsz_UJgflHsnolspSCIlTccHnQ3SiuJw/export?format=csv",
-    "BYL 360": "https://docs.google.com/spreadsheets/d/1VeApY8r7bVXcgOu6-J5toKbASNSRtHQdJWozNsYu0hI/export?format=csv",
-    "BEBE Olympia": "https://docs.google.com/spreadsheets/d/1dWE2NyI2bRS-k2uzDNBH7zYVYI4yOsDnCr7HaGtkqqI/export?format=csv",
-    "FD Olympia": "https://docs.google.com/spreadsheets/d/1Lua5oVoPAeO9rccEmmX8L8a6b418xDe-6r_AyBf_dPg/export?format=csv",
-    "LVER Olympia": "https://docs.google.com/spreadsheets/d/1JbhsFZWPZgxXVe4-PlqeqUZFy5k8bufHE1SD_STStTI/export?format=csv",
-    "LVER Avenue": "https://docs.google.com/spreadsheets/d/1s0vTurRXOK8lwrnoXNDnpF8G1BDm4svvxSr7osGQbWk/export?format=csv",
-    "BYL Avenue": "https://docs.google.com/spreadsheets/d/1jtCTBHnHmdQX8cMTYOL7Dj-kuX0nkKzGNgp0SmnTOnA/export?format=csv",
-    "LVER Gatemall": "https://docs.google.com/spreadsheets/d/1QtWsNwKm6ChnoLhw368jrpXX6B-xbWSZnscQ0E6ea0c/export?format=csv",
-    "BYL Mohalab": "https://docs.google.com/spreadsheets/d/1easCQaB098EO1_rw0sKuNf6SXDLvSbE4D0RoiCUH-y4/export?format=csv",
-    "LVER Mohalab": "https://docs.google.com/spreadsheets/d/1OH0ko6btNzsqBXKP65sDzOXwbjM-DMLcdK9_1Sjphpo/export?format=csv",
-    "BYL Koutmall": "https://docs.google.com/spreadsheets/d/1XuqWn1ExRllisPEMVD-l0noo1_5yjADi6qxP02tmSLA/export?format=csv",
-    "LVER Koutmall": "https://docs.google.com/spreadsheets/d/1Fp5aOxXDLlNHr2Mxw5CCdqyE231CJHha1qg92ca9Q6U/export?format=csv",
-    "FD Boulevard": "https://docs.google.com/spreadsheets/d/1_rYcZoqKXw8VAyX91CJFHe7oOC1OM2PfBrW9qucg7z4/export?format=csv",
-    "FD Al Bahar": "https://docs.google.com/spreadsheets/d/16oQHWV6zYhJlEISQcibTFbU4RtJGug6lwjHJpsnfiuc/export?format=csv",
-    "Hunkemoller": "https://docs.google.com/spreadsheets/d/1JtsMMCU79bFQhEwq4cUFDOsVSv9obJRS1dSDeIucqDQ/export?format=csv",
-    "LVER Al Raya": "https://docs.google.com/spreadsheets/d/1gwm11GBN7KhBh4xf93-0JQfY42bfKXd0wH7kGCznKwk/export?format=csv",
+    "Etam Avenue": ("153tgWpTT65qOVL_KJpGOMP7xNYmG-Sc5JNNIhcsz490", None),
+    "Yammay Avenue": ("1O3b842Nvwgb-HIpBZ--cEMfcnlRrKmfJ8HNa0TccF14", None),
+    "Ws Gatemall": ("15wFd-tdzSr4AtJ9bgmelju0XoAVcCL4EPDeMfqdWkbg", None),
+    "Etam Gatemall": ("1nKtjIlcPkOH6jPcWAfEDSq9uxA4iap80Bjpch-LHg8Y", None),
+    "Ws Mohalab": ("1U0bIjdb6MEzlN_i83s86TG6k4Xd64hRlcbm3P7wcs_o", None),
+    "TT Mohalab": ("1EgrYSYxvcEg0DIuilrQLdutzW-jmKhqyoElZNQshUf8", None),
+    "Benetone Mohalab": ("1o9tibo9_zlmbwBB4VKAiJK6sabGkhCK_hOyeHWl2xi8", None),
+    "Ws Sharq": ("1gNTn5xfVIH8mY8-BWabPAAemoQGzO27Yf3__5OgNXhY", None),
+    "Ws Koutmall": ("167dhfW8-4M7Z-T9gtat6MgNuIT1iOiNdSO8WGKktNDY", None),
+    "Yammay Al koutmall": ("1rxxfgnrlQMr9OaKOIOwYlL-ZN5FXbXat1i3F_9w9HQQ", None),
+    "Etam Marina": ("1tk1fWxxNGmWKpK3kSqI01JFGd7AlUNZeImZcjOMXJpc", None),
+    "Celio Marina": ("1hahRBpfD02oLKcxsvdDSZVEhkMT4YeAz1dg3dj6e24c", None),
+    "Etam Warehouse": ("1xScMArE5q7w7iU8phhY_y1l_B9SIO1oEC0MUmtyBTRg", None),
+    "Celio Warehouse": ("1Tz96_oel75cno1kdRUmhRqBhGkcBsMit-kxxOLEg5_Q", None),
+    "Spring Field": ("1aKR_nleV4eO9TJNHv0a8BXKutCBY_CeuJLIATXcoyB4", None),
+    "Designer Avenue": ("1QvEUOisRktU33zhWcCxhq39F2MlN72GM-D6wjZPrhyI", None),
+    "D&H Warehouse": ("1nA5qlW2MA9gp39OLZqO4Y9B4oAbvifJHuFIOYjk7eCI", None),
+    "S21": ("1O8y7iuTZ-6jzsz_UJgflHsnolspSCIlTccHnQ3SiuJw", None),
+    "Doha Store Warehouse": ("1VeApY8r7bVXcgOu6-J5toKbASNSRtHQdJWozNsYu0hI", None),
+    "Doha Store": ("1dWE2NyI2bRS-k2uzDNBH7zYVYI4yOsDnCr7HaGtkqqI", None),
+    "S17": ("1Lua5oVoPAeO9rccEmmX8L8a6b418xDe-6r_AyBf_dPg", None),
+    "S41": ("1JbhsFZWPZgxXVe4-PlqeqUZFy5k8bufHE1SD_STStTI", None),
+    "S33": ("1s0vTurRXOK8lwrnoXNDnpF8G1BDm4svvxSr7osGQbWk", None),
+    "Hadaba HO": ("1jtCTBHnHmdQX8cMTYOL7Dj-kuX0nkKzGNgp0SmnTOnA", None),
+    "Hunkemoller Avenue": ("1YZiP-0bltMIOnGEq1oSuMulcpVzM5PL_NM13dFhuqK8", None),
+    "S40": ("1QtWsNwKm6ChnoLhw368jrpXX6B-xbWSZnscQ0E6ea0c", None),
+    "Hawally Warehouse ( Hadabah )": ("1easCQaB098EO1_rw0sKuNf6SXDLvSbE4D0RoiCUH-y4", None),
+    "Al hadabah Drivers": ("1OH0ko6btNzsqBXKP65sDzOXwbjM-DMLcdK9_1Sjphpo", None),
+    "Lighting Plus": ("1XuqWn1ExRllisPEMVD-l0noo1_5yjADi6qxP02tmSLA", None),
+    "S39": ("1Fp5aOxXDLlNHr2Mxw5CCdqyE231CJHha1qg92ca9Q6U", None),
+    "S16": ("1_rYcZoqKXw8VAyX91CJFHe7oOC1OM2PfBrW9qucg7z4", None),
+    "S14": ("16oQHWV6zYhJlEISQcibTFbU4RtJGug6lwjHJpsnfiuc", None),
+    "S20": ("1JtsMMCU79bFQhEwq4cUFDOsVSv9obJRS1dSDeIucqDQ", None),
+    "S42": ("1gwm11GBN7KhBh4xf93-0JQfY42bfKXd0wH7kGCznKwk", None),
+    "brand managers": ("1zIzNvg62fu3aiSorYuQHyd6QeY_HeyPKWrTYxeUCqhk", None),
+    "floor managers": ("1zR79LssZ8FkZtkYUTPmacVookCtmZCYb5VPhZHnruTE", None),
+    "Warehouse": ("1opWFJv14RyvOAafIzJu9d1b60AkGOkCQvcFlAT9chkc", None),
+    "Marina Mall": ("1CKG2tYMLC6qDY4Z1I43rR63FaFydTJBQNRyaB26NeEw", None),
+    "Bustan": ("192g5jq4CbRo30kmgUUimk8_yAPOywkTWXgG4s6zI5nk", None),
+    "DASHCO": ("1D8mffrtNGvY_wnt8jJCpUmJClN-xmqlSGdeu2e-iwqY", None),
+    "Admin Science": ("1RYDX-jPNeB52VAC5ovv6hXBWlXe1etihLvx544aT3l4", None),
+    "Life Science": ("1-H2NJDF1L-6DRXJNbOPTh-x9Xi9FCE0_OBrC6YkO4zQ", None),
+    "International Hospital": ("14IUbRRpsnO6s_rWgOqA3GgRYR71x6b9m_iYtO-pNGKo", None),
+    "Mohalab": ("19dtrtH6kCLp_etG6dva03anTIiLYtHlqivdF37MoV44", None),
+    "College of Science": ("1JWALXVWWm5e0B9GA-dW_PMNHVK5Y94FIxjVwiNNLo8c", None),
+    "Makki Juma": ("1v47A4y1Ys6I_F1927ymABuqxQaI0tV3-V1-B_F92xk4", None),
+    "Police Force": ("1fXSAmk0MZwIIbZf2-xbgs5804eFcIOGFanNdny5sIy4", None),
+    "Jahar Hospital": ("1ud8koWY2v7_c5T4y--6Slrtn8UxE2GN_VvSt23DmOsU", None),
+    "Farwaniya Hospital": ("1-NyjZgwaWv1bvpF5PUz_1Izw2dRgZ48v7BgGfe1f6xQ", None),
+    "Jaber Hospital": ("1iy6pgd7CiXZR8Lau7dvd7gtpVHq-chq1TDi7MBaWnsQ", None),
+    "Badriya Hospital": ("1wurL9jUXypUObHwgjRotBd22-QdwJ3wEAPfJ0hKytNg", None),
+    "BEAUTY AND TRAVEL": ("1VWbNLzKgcfxUQx1YLttiAyf3_s5ITzVfuOVcD_vaOio", None),
+    "CIT": ("1F4sSTHjLn4F-UHGVXBWc-x9mxcllYs1r8j2LG_tiu8g", None),
+    "Nursing Boys": ("1xVGaeF6QO-EaE3tnaFkgQzGN1SXYNIWO8W8xWIImjp4", None),
+    "Nursing Girls": ("1MRWfpWMOhmyAP7k8oT9m5Tw6ikYhW_fNEVgula-3GOs", None),
+    "Edu Boys": ("19HGjc334GKdgFr3ACMEyNvlUjgJgP0mOiMO_-YyskZc", None),
+    "Edu Boys PAAET": ("1ydEouRS6QJmbhmmnC_tZUWhEdy5ghuxOsVTN8DKNZxs", None),
+    "Edu Girls": ("1kQzTAw_TopvmP5QL7E9initiF_xTXdPkC9LnKME5nyI", None),
+    "Edu Girls 2": ("1ruvMegtyC9QmOz4hK4RulS0HqJmcNpBZ5UKev4VBVvw", None),
+    "PAAET Admin": ("19nFvunZ4GLbb9VZ_bmj_lvI_5N4wxC6lSr5TO3nx5pM", None),
+    "Khaitan": ("1JsqzNF_M3aj_Tg7G6P_AkWjWrPUjTHjqoOdnCz62Wdc", None),
+    "Capital Governorate": ("1L1KoxiAMxvn13zpW6hvISFhWdFqo_WkFnets58yRiyE", None),
+    "Adan Hospital": ("1XNj1Tdr2k-JBFpj0Qod-AjEVpyVuj-t8jItVAyHl9Cw", None),
+    "JABER DENTAL": ("1Sjlx0i7nIExBNiuewu5CFG35sLj5tfZ0SO3gsTcCEh0", None),
+    "2nd cup Warehouse": ("1uRNl-KdUHtWx2NGVnI0tUcKx_qshwag-llvW5NKougE", None),
+    "Ws Olympia": ("1i1T6ED5n_JnMzwWzl4XqP1He3XtGe4ubei0IPv7IRtg", None),
+    "Ws 360": ("1jF2SHpPS0lEvG-nxz7TLRfrU-X2yqhTbwvBiL2NYL_c", None),
+    "Etam 360": ("1o8QTsay4QYeQ_CPlh3xvkY99He1G8aF4VlnQRZEBIYw", None),
+    "Ws Avenue": ("1xlIeoD_CU5l6-wHr8Nuc5ASoUlxmtg2Tfj32Yvcc00Y", None),
+    "LVER 360": ("1O8y7iuTZ-6jzsz_UJgflHsnolspSCIlTccHnQ3SiuJw", None),
+    "BYL 360": ("1VeApY8r7bVXcgOu6-J5toKbASNSRtHQdJWozNsYu0hI", None),
+    "BEBE Olympia": ("1dWE2NyI2bRS-k2uzDNBH7zYVYI4yOsDnCr7HaGtkqqI", None),
+    "FD Olympia": ("1Lua5oVoPAeO9rccEmmX8L8a6b418xDe-6r_AyBf_dPg", None),
+    "LVER Olympia": ("1JbhsFZWPZgxXVe4-PlqeqUZFy5k8bufHE1SD_STStTI", None),
+    "LVER Avenue": ("1s0vTurRXOK8lwrnoXNDnpF8G1BDm4svvxSr7osGQbWk", None),
+    "BYL Avenue": ("1jtCTBHnHmdQX8cMTYOL7Dj-kuX0nkKzGNgp0SmnTOnA", None),
+    "LVER Gatemall": ("1QtWsNwKm6ChnoLhw368jrpXX6B-xbWSZnscQ0E6ea0c", None),
+    "BYL Mohalab": ("1easCQaB098EO1_rw0sKuNf6SXDLvSbE4D0RoiCUH-y4", None),
+    "LVER Mohalab": ("1OH0ko6btNzsqBXKP65sDzOXwbjM-DMLcdK9_1Sjphpo", None),
+    "BYL Koutmall": ("1XuqWn1ExRllisPEMVD-l0noo1_5yjADi6qxP02tmSLA", None),
+    "LVER Koutmall": ("1Fp5aOxXDLlNHr2Mxw5CCdqyE231CJHha1qg92ca9Q6U", None),
+    "FD Boulevard": ("1_rYcZoqKXw8VAyX91CJFHe7oOC1OM2PfBrW9qucg7z4", None),
+    "FD Al Bahar": ("16oQHWV6zYhJlEISQcibTFbU4RtJGug6lwjHJpsnfiuc", None),
+    "Hunkemoller": ("1JtsMMCU79bFQhEwq4cUFDOsVSv9obJRS1dSDeIucqDQ", None),
+    "LVER Al Raya": ("1gwm11GBN7KhBh4xf93-0JQfY42bfKXd0wH7kGCznKwk", None),
 }
 
 
+def sheet_export_url(spreadsheet_id: str, gid=None) -> str:
+    """Google Sheets CSV export URL for a spreadsheet (and optional sheet gid)."""
+    url = f"https://docs.google.com/spreadsheets/d/{spreadsheet_id}/export?format=csv"
+    return f"{url}&gid={gid}" if gid is not None else url
 
+
+@functools.lru_cache(maxsize=1024)
 def resolve_location_from_numeric(filename: str):
     """
     Convert numeric filename like '111.xlsx' → real location name.
     Format: CLLL
-        C   = company number (1,2,3,4)
-        LLL = location number (no leading zeros)
+        C   = company number (see COMPANY_BY_DIGIT)
+        LLL = location code exactly as written in LOCATION_MAP (e.g. '01', '17')
     Returns the location name or None.
     """
-    import os
-
-    base = os.path.splitext(filename)[0].strip()
-
-    # Must be numeric
-    if not base.isdigit():
+    base = filename.rsplit(".", 1)[0].strip()
+    if not base.isdigit() or len(base) < 2:
         return None
+    return LOCATION_BY_CODE.get((COMPANY_BY_DIGIT.get(base[0]), base[1:]))
 
-    # Company = first digit
-    company = base[0]
 
-    # Location code = rest
-    location = base[1:]
-    if not location:
-        return None
-
-    company_dict = LOCATION_MAP.get(company)
-    if not company_dict:
-        return None
-
-    return company_dict.get(location)
+@functools.lru_cache(maxsize=256)
+def get_company_for_source(source_name: str):
+    """
+    Returns the company that owns a Source_Name, or None for unknown sources
+    and for sources configured under several companies (see COMPANIES_FOR_SOURCE).
+    Cached because callers resolve the same handful of sources over and over.
+    """
+    return SOURCE_TO_COMPANY.get(source_name)
 
 
 # --- Column Name Mapping ---
@@ -646,6 +720,18 @@ COLUMN_MAPPING = {
     'Date/Time': ['Date/Time', 'Time'], # 'Time' is already here
     'Status': ['Status', 'State']
 }
+# Inverted view, alias → standard column, for renaming a whole frame with one
+# df.rename(columns=...) call. Aliases keep COLUMN_MAPPING's order, so for each standard
+# column the first alias listed is the preferred one when a file carries several.
+COLUMN_ALIASES = {
+    alias: standard_col
+    for standard_col, aliases in COLUMN_MAPPING.items()
+    for alias in aliases
+}
+assert len(COLUMN_ALIASES) == sum(len(aliases) for aliases in COLUMN_MAPPING.values()), \
+    "Column alias listed under two standard columns"
+# Standard columns every fingerprint file must provide (through any of their aliases)
+CRITICAL_COLUMNS = ('No.', 'Name', 'Date/Time')
 # --- END Column Mapping ---
 
 # --- Helper Function: Formats a pandas Timedelta object into HH:MM:SS string. ---
@@ -661,12 +747,38 @@ def format_timedelta_to_hms(td):
     minutes, seconds = divmod(remainder, 60)
     return f"{hours:02}:{minutes:02}:{seconds:02}"
 
+def format_timedelta_series(td: pd.Series) -> pd.Series:
+    """
+    Vectorized format_timedelta_to_hms for a whole timedelta column.
+    Same output as applying the scalar version row by row, without a Python call per cell.
+    """
+    if td.empty:
+        return pd.Series(index=td.index, dtype=object)
+    # Whole seconds straight from the int64 nanoseconds, truncated toward zero like int(); NaT → 0
+    values = pd.to_timedelta(td).to_numpy(dtype="timedelta64[ns]")
+    nanoseconds = values.view("int64")
+    seconds = np.where(nanoseconds < 0, -(-nanoseconds // 1_000_000_000), nanoseconds // 1_000_000_000)
+    seconds[np.isnat(values)] = 0
+    hours, remainder = np.divmod(seconds, 3600)
+    minutes, seconds = np.divmod(remainder, 60)
+    hms = np.char.add(
+        np.char.add(np.char.zfill(hours.astype(str), 2), ":"),
+        np.char.add(np.char.add(np.char.zfill(minutes.astype(str), 2), ":"), np.char.zfill(seconds.astype(str), 2)),
+    )
+    return pd.Series(hms, index=td.index, dtype=object)
+
 # Function to safely merge dictionaries, with later dicts overriding earlier ones
 def merge_configs(base, override):
     """
     Recursively merges two dictionaries. Values from 'override' overwrite 'base' values.
     If a key exists in both and its value is a dictionary, the dictionaries are merged.
+    Flat overrides (the normal case for rules) take a single C-level dict merge.
     """
+    if not override:
+        return dict(base)
+    if not any(isinstance(v, dict) for v in override.values()):
+        return {**base, **override}
+
     merged = base.copy()
     if override:
         for k, v in override.items():
@@ -676,49 +788,178 @@ def merge_configs(base, override):
                 merged[k] = v
     return merged
 
-def get_effective_rules_for_employee_day(company_name: str, employee_no: str, source_name: str) -> dict:
+def _apply_implicit_rotational(rules: dict) -> dict:
+    """
+    Only imply rotational if weekend_days is explicitly empty/None: such rules become
+    rotational (1 day off per week unless stated) unless they already say otherwise.
+    """
+    if not rules.get("weekend_days") and not rules.get("is_rotational_off", False):
+        rules = {**rules, "is_rotational_off": True}
+        rules.setdefault("rotational_days_off_per_week", 1)
+    return rules
+
+# Default -> Location merge for every configured (company, source), with the implicit
+# rotational rule already applied; (company, None) holds the company defaults used for
+# sources without location rules. Only the employee override is merged per call.
+# Entries are read-only like the layers they are merged from.
+_LOCATION_RULES_TABLE = {}
+for _company, _cfg in COMPANY_CONFIGS.items():
+    _defaults = _cfg.get("default_rules", _EMPTY_RULES)
+    _LOCATION_RULES_TABLE[(_company, None)] = MappingProxyType(_apply_implicit_rotational(dict(_defaults)))
+    for _source_name, _rules in _cfg.get("location_rules", _EMPTY_RULES).items():
+        _LOCATION_RULES_TABLE[(_company, sys.intern(_source_name))] = \
+            MappingProxyType(_apply_implicit_rotational(_defaults | _rules))
+del _company, _cfg, _defaults, _source_name, _rules
+
+# Base rules for a company that has no configuration at all
+_UNCONFIGURED_COMPANY_RULES = MappingProxyType(_apply_implicit_rotational({}))
+
+@dataclass(slots=True, frozen=True)
+class Rules:
+    """
+    Resolved rules for one employee/day (Default -> Location -> Employee Override).
+    Field defaults mirror the fallbacks consumers used to apply with dict.get().
+    """
+    standard_shift_hours: float = 8
+    short_t_threshold_hours: float = 7.5
+    more_t_start_hours: float = 9
+    more_t_enabled: bool = True
+    weekend_days: frozenset = frozenset()
+    is_rotational_off: bool = False
+    fixed_break_deduction_minutes: int = 0
+    fixed_break_threshold_hours: float = 0
+    opening_hours_count: int = 0
+    is_24_hour_location: bool = False
+    rotational_days_off_per_week: int = 1
+    weekend_rule_type: str = "fixed" # "fixed" or "alternating_f_fs"
+    # Derived from weekend_days: bit d set <=> weekday d is a weekend
+    weekend_bits: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        weekend_bits = 0
+        for day in self.weekend_days:
+            weekend_bits |= 1 << day
+        object.__setattr__(self, "weekend_bits", weekend_bits)
+
+    @classmethod
+    def from_mapping(cls, rules: dict) -> "Rules":
+        """Builds Rules from a merged rules dict; unknown keys raise TypeError."""
+        values = {k: v for k, v in rules.items() if v is not None}
+        if "weekend_days" in values:
+            values["weekend_days"] = frozenset(values["weekend_days"])
+        return cls(**values)
+
+def get_effective_rules_for_employee_day(company_name: str, employee_no: str, source_name: str) -> Rules:
     """
     Determines the effective rules for a given employee on a specific day,
     applying hierarchy: Default -> Location -> Employee Override.
-    Also handles implicit rotational status if a location has no fixed weekend days.
+    The implicit rotational rule (no fixed weekend days) is already folded into
+    _LOCATION_RULES_TABLE at import, so only the employee override is merged here.
+    Results are cached per (company, employee, source); Rules is frozen, so sharing is safe.
     """
-    company_config = COMPANY_CONFIGS.get(company_name, {})
-    
-    # Start with default rules for the company
-    effective_rules = company_config.get("default_rules", {}).copy()
-
-    # Apply location-specific overrides
-    location_rules = company_config.get("location_rules", {}).get(source_name, {})
-    effective_rules = merge_configs(effective_rules, location_rules)
+    return _get_effective_rules_cached(company_name, employee_no, source_name)
 
-    # --- Reverted Logic: Only imply rotational if explicitly empty/None ---
-    if (effective_rules.get("weekend_days") == [] or effective_rules.get("weekend_days") is None) and \
-       not effective_rules.get("is_rotational_off", False):
-        effective_rules["is_rotational_off"] = True
-        if "rotational_days_off_per_week" not in effective_rules:
-            effective_rules["rotational_days_off_per_week"] = 1
-    # --- End New Logic ---
+@functools.lru_cache(maxsize=4096)
+def _get_effective_rules_cached(company_name: str, employee_no: str, source_name: str) -> Rules:
+    # Default -> Location (precomputed)
+    base_rules = _LOCATION_RULES_TABLE.get((company_name, source_name))
+    if base_rules is None:
+        base_rules = _LOCATION_RULES_TABLE.get((company_name, None), _UNCONFIGURED_COMPANY_RULES)
 
     # Apply employee-specific overrides (highest precedence)
-    employee_rules = company_config.get("employee_overrides", {}).get(employee_no, {})
-    effective_rules = merge_configs(effective_rules, employee_rules)
-    
-    return effective_rules
+    employee_rules = OVERRIDES.get((company_name, "emp", employee_no))
+    if employee_rules: # rules are flat, so a C-level dict union is the whole merge
+        base_rules = base_rules | employee_rules
+    return Rules.from_mapping(base_rules)
+
+def clear_rules_cache():
+    """Drops memoized rules; call after the rule tables are rebuilt."""
+    _get_effective_rules_cached.cache_clear()
+    get_expected_working_days_in_period.cache_clear()
+
+# Location-level rules (no employee override) per company, indexed by the
+# integer location code from LOCATION_MAP: RULES_BY_CODE["D&H"][17] -> Rules for "Etam Marina".
+# Unused codes hold None.
+RULES_BY_CODE = {}
+for _company, _locations in LOCATION_MAP.items():
+    _rules_by_code = [None] * (max(int(code) for code in _locations.values()) + 1)
+    for _source_name, _code in _locations.items():
+        _rules_by_code[int(_code)] = get_effective_rules_for_employee_day(_company, "", _source_name)
+    RULES_BY_CODE[_company] = _rules_by_code
+del _company, _locations, _rules_by_code, _source_name, _code
+
+# "alternating_f_fs" weekends as a [iso_week % 2, weekday] lookup table:
+# even ISO weeks Friday and Saturday, odd ISO weeks Friday only
+_ALTERNATING_WEEKEND_LUT = np.zeros((2, 7), dtype=bool)
+_ALTERNATING_WEEKEND_LUT[0, [calendar.FRIDAY, calendar.SATURDAY]] = True
+_ALTERNATING_WEEKEND_LUT[1, calendar.FRIDAY] = True
+
+def weekend_mask(dt_index: pd.DatetimeIndex, rules: Rules) -> np.ndarray:
+    """
+    Vectorized weekend check: returns a boolean array, True where the day in
+    `dt_index` is a weekend under the rules.
+      - "fixed": the rules' weekend_days.
+      - "alternating_f_fs": odd ISO weeks Friday only, even ISO weeks Friday and Saturday.
+    Unknown rule types have no weekends.
+    """
+    day_of_week = dt_index.weekday.to_numpy()
+    if rules.weekend_rule_type == "alternating_f_fs":
+        iso_week_parity = dt_index.isocalendar().week.to_numpy(dtype=np.int64) % 2
+        return _ALTERNATING_WEEKEND_LUT[iso_week_parity, day_of_week]
+    if rules.weekend_rule_type != "fixed" or not rules.weekend_days:
+        return np.zeros(len(dt_index), dtype=bool)
+    # One shift-and-mask per day against the precomputed weekend bits instead of a membership test
+    return ((rules.weekend_bits >> day_of_week) & 1).astype(bool)
+
+@functools.lru_cache(maxsize=None)
+def busday_weekmask(weekend_days: frozenset):
+    """
+    numpy busday weekmask ("1111001" = Mon..Sun, 0 = weekend) for a set of weekend days,
+    built once per distinct set. None when every day is a weekend, which busday_count rejects.
+    """
+    weekend_bits = 0
+    for day in weekend_days:
+        weekend_bits |= 1 << day
+    weekmask = "".join("0" if (weekend_bits >> day) & 1 else "1" for day in range(7))
+    return weekmask if "1" in weekmask else None
+
+@functools.lru_cache(maxsize=512)
+def weekends_in_period(start_date, end_date, weekend_days: frozenset) -> int:
+    """
+    Counts the days in [start_date, end_date] that fall on one of `weekend_days`.
+    Closed form per weekday: the first occurrence of weekday d is (d - start weekday) % 7 days in,
+    then one more every 7 days.
+    """
+    start_date = pd.Timestamp(start_date).date()
+    end_date = pd.Timestamp(end_date).date()
+    if start_date > end_date:
+        return 0
+
+    total_days = (end_date - start_date).days + 1
+    start_dow = start_date.weekday()
+    count = 0
+    for day in weekend_days:
+        first_offset = (day - start_dow) % 7
+        if first_offset < total_days:
+            count += (total_days - first_offset - 1) // 7 + 1
+    return count
 
 # Helper to get expected working days for a period, considering alternating weekends
-def get_expected_working_days_in_period(start_date, end_date, rules: dict) -> float: # Return float for precision
+@functools.lru_cache(maxsize=1024)
+def get_expected_working_days_in_period(start_date, end_date, rules: Rules) -> float: # Return float for precision
     """
     Calculates the number of expected working days within a given date range,
     considering company-specific weekend rules, including alternating weekends and rotational offs.
     Returns the expected number of working days (can be float for rotational).
+    Cached: reports reuse a few windows with a few distinct (hashable, frozen) Rules.
     """
     if start_date is None or end_date is None or start_date > end_date:
         return 0.0
 
     total_days_in_period_float = (end_date - start_date).days + 1.0 # Use float for calculations
 
-    is_rotational_off = rules.get("is_rotational_off", False)
-    rotational_days_off_per_week = rules.get("rotational_days_off_per_week", 1) # Default 1 day off for rotational
+    is_rotational_off = rules.is_rotational_off
+    rotational_days_off_per_week = rules.rotational_days_off_per_week
 
     if is_rotational_off:
         # Calculate expected off days based on rate per week
@@ -726,36 +967,90 @@ def get_expected_working_days_in_period(start_date, end_date, rules: dict) -> fl
         expected_working_days_exact = total_days_in_period_float - expected_off_days_exact
         return expected_working_days_exact
     else:
-        expected_days = 0
-        current_date = start_date
-        
-        weekend_days = rules.get("weekend_days", [calendar.FRIDAY, calendar.SATURDAY])
-        weekend_rule_type = rules.get("weekend_rule_type", "fixed") # "fixed" or "alternating_f_fs"
-
-        while current_date <= end_date:
-            day_of_week = current_date.weekday() # Monday is 0, Sunday is 6
-
-            is_weekend = False
-            if weekend_rule_type == "fixed":
-                if day_of_week in weekend_days:
-                    is_weekend = True
-                else:
-                    is_weekend = False
-            elif weekend_rule_type == "alternating_f_fs":
-                iso_week_number = current_date.isocalendar()[1]
-                if (iso_week_number % 2) == 1: # Odd weeks: Friday only (Week 1, 3, 5...)
-                    if day_of_week == calendar.FRIDAY:
-                        is_weekend = True
-                    else:
-                        is_weekend = False
-                else: # Even weeks: Friday and Saturday (Week 2, 4, 6...)
-                    if day_of_week == calendar.FRIDAY or day_of_week == calendar.SATURDAY:
-                        is_weekend = True
-                    else:
-                        is_weekend = False
-            
-            if not is_weekend:
-                expected_days += 1
-            
-            current_date += timedelta(days=1)
-        return float(expected_days) # Return float even for fixed, for consistency
+        weekend_rule_type = rules.weekend_rule_type
+
+        if weekend_rule_type == "fixed":
+            # Fixed weekends: count weekend days in closed form
+            return total_days_in_period_float - weekends_in_period(start_date, end_date, rules.weekend_days)
+
+        # Alternating (ISO-week dependent) weekends: classify the whole period at once
+        period_days = pd.date_range(start_date, end_date, freq="D")
+        return float((~weekend_mask(period_days, rules)).sum())
+
+def get_expected_working_days_for_periods(start_dates, end_dates, rules: Rules) -> np.ndarray:
+    """
+    Array version of get_expected_working_days_in_period for many periods under the same rules
+    (e.g. every employee sharing a rules set). Element i equals
+    get_expected_working_days_in_period(start_dates[i], end_dates[i], rules).
+    """
+    starts = pd.to_datetime(pd.Series(start_dates, dtype=object)).to_numpy(dtype="datetime64[D]")
+    ends = pd.to_datetime(pd.Series(end_dates, dtype=object)).to_numpy(dtype="datetime64[D]")
+    valid = ~(np.isnat(starts) | np.isnat(ends)) & (starts <= ends)
+    expected = np.zeros(len(starts), dtype=float)
+    if not valid.any():
+        return expected
+    starts, ends = starts[valid], ends[valid]
+    total_days = (ends - starts).astype(np.int64) + 1.0
+
+    if rules.is_rotational_off:
+        expected[valid] = total_days - total_days * (rules.rotational_days_off_per_week / 7.0)
+    elif rules.weekend_rule_type == "fixed":
+        weekmask = busday_weekmask(rules.weekend_days)
+        if weekmask is not None: # an all-weekend mask leaves no working days
+            expected[valid] = np.busday_count(starts, ends + np.timedelta64(1, "D"), weekmask=weekmask)
+    else:
+        # Alternating weekends depend on the ISO week: compute each distinct window once
+        windows = {}
+        for i, window in zip(np.flatnonzero(valid), zip(starts.tolist(), ends.tolist())):
+            if window not in windows:
+                windows[window] = get_expected_working_days_in_period(*window, rules)
+            expected[i] = windows[window]
+    return expected
+
+
+# --- Read-only views of the shared tables ---
+# Every caller only reads these; wrapping them makes an accidental write fail loudly
+# instead of silently changing the configuration for every later run in the process.
+# Source names are the keys every lookup goes through, so they are interned as well: a lookup
+# with an interned name then matches on identity before falling back to a string compare.
+LOCATION_MAP = MappingProxyType({
+    company: MappingProxyType({sys.intern(source_name): code for source_name, code in locations.items()})
+    for company, locations in LOCATION_MAP.items()
+})
+FILE_DATE_FORMATS = MappingProxyType({sys.intern(source_name): fmt for source_name, fmt in FILE_DATE_FORMATS.items()})
+STORE_OPS_LINKS = MappingProxyType({sys.intern(name): link for name, link in STORE_OPS_LINKS.items()})
+
+__all__ = [
+    "COMPANY_CONFIGS",
+    "OVERRIDES",
+    "FILE_DATE_FORMATS",
+    "GENERAL_DATE_FORMATS",
+    "LOCATION_MAP",
+    "SHARED_SOURCE_NAMES",
+    "COMPANIES_FOR_SOURCE",
+    "SOURCE_TO_COMPANY",
+    "COMPANY_BY_DIGIT",
+    "LOCATION_BY_CODE",
+    "STORE_OPS_LINKS",
+    "sheet_export_url",
+    "COLUMN_MAPPING",
+    "COLUMN_ALIASES",
+    "CRITICAL_COLUMNS",
+    "RULES_BY_CODE",
+    "Rules",
+    "normalize_employee_id",
+    "resolve_location_from_numeric",
+    "get_company_for_source",
+    "get_date_format",
+    "date_formats_for_source",
+    "format_timedelta_to_hms",
+    "format_timedelta_series",
+    "merge_configs",
+    "get_effective_rules_for_employee_day",
+    "clear_rules_cache",
+    "weekend_mask",
+    "busday_weekmask",
+    "weekends_in_period",
+    "get_expected_working_days_in_period",
+    "get_expected_working_days_for_periods",
+]
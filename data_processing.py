@@ -1,19 +1,30 @@
 import pandas as pd
+import numpy as np
+import functools
+import hashlib
 import io
 import os
-from datetime import timedelta, datetime, date
+from datetime import timedelta, date
 import streamlit as st # Used for st.session_state.get('debug_mode', False)
 import re
+import sys
 import logging
-from config import LOCATION_MAP
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+from pandas.tseries.api import guess_datetime_format
+from config import LOCATION_BY_CODE
 
 
 # Import configurations and helper functions from config.py
 from config import (
     COMPANY_CONFIGS,
-    FILE_DATE_FORMATS,
     COLUMN_MAPPING,
+    COLUMN_ALIASES,
+    CRITICAL_COLUMNS,
     format_timedelta_to_hms,
+    format_timedelta_series,
+    get_date_format,
+    date_formats_for_source,
     get_effective_rules_for_employee_day,
     normalize_employee_id
 )
@@ -21,6 +32,146 @@ from config import (
 # Import Second Cup specific logic functions
 from second_cup_logic import calculate_24_hour_shifts # Only import calculate_24_hour_shifts
 
+
+def _infer_datetime_format(values: pd.Series, sample_size: int = 200):
+    """
+    Returns the single strftime format that parses every sampled 'Date/Time' string, or None.
+    Candidates come from pandas' guess_datetime_format with dayfirst on and off. A sample that
+    several candidates fit (e.g. every day <= 12) is ambiguous and left to the ordered format list.
+    """
+    if not (pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values)):
+        return None
+    unique_values = values.dropna().astype(str).str.strip().unique()
+    if len(unique_values) == 0:
+        return None
+    sample = unique_values[:: max(1, len(unique_values) // sample_size)]
+
+    candidates = set()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning) # dayfirst/format mismatch notices
+        for value in sample:
+            for dayfirst in (True, False):
+                candidates.add(guess_datetime_format(value, dayfirst=dayfirst))
+    candidates.discard(None)
+
+    fitting = [
+        fmt for fmt in candidates
+        if pd.to_datetime(pd.Series(sample), format=fmt, errors='coerce').notna().all()
+    ]
+    return fitting[0] if len(fitting) == 1 else None
+
+
+def _read_upload_csv(data: bytes) -> pd.DataFrame:
+    """
+    Parses an uploaded CSV straight from its UTF-8 bytes.
+    Uses pyarrow's multithreaded parser when pyarrow is installed, else the default C parser.
+    """
+    try:
+        return pd.read_csv(io.BytesIO(data), engine='pyarrow')
+    except (ImportError, ValueError):
+        # pyarrow missing, or a ragged file it refuses (ArrowInvalid is a ValueError)
+        return pd.read_csv(io.BytesIO(data))
+
+
+def _read_workbook(data: bytes):
+    """
+    Parses an uploaded workbook's first sheet. A read error is returned instead of raised,
+    so _process_single_file can report it against every upload of that workbook.
+    """
+    try:
+        return pd.read_excel(io.BytesIO(data))
+    except Exception as e:
+        return e
+
+
+@functools.lru_cache(maxsize=512)
+def _source_name_from_filename(filename: str) -> str:
+    """
+    Source_Name for a file not named by the numeric convention: the location after a legacy
+    ".xlsx - " prefix, else the base name without extension.
+    """
+    parts = filename.split('.xlsx - ')
+    if len(parts) > 1:
+        last_segment = parts[-1]
+        # Remove trailing extension (e.g., ".xlsx") from the last segment
+        source_name = last_segment.replace(os.path.splitext(last_segment)[1], '')
+    else:
+        source_name = os.path.splitext(os.path.basename(filename))[0]
+
+    return source_name.strip()
+
+
+# Uploaded files are read concurrently; read_csv / read_excel / to_datetime spend most of
+# their time in C code that releases the GIL
+FILE_READ_WORKERS = 8
+
+_ZERO_TD = pd.Timedelta(0)
+_ZERO_HMS = '00:00:00'
+
+def _format_hms(td) -> str:
+    """format_timedelta_to_hms, short-circuiting the zero durations most days have."""
+    return _ZERO_HMS if td == _ZERO_TD else format_timedelta_to_hms(td)
+
+# Columns of the daily report, in output order
+_DAILY_REPORT_COLUMNS = ['Source_Name', 'No.', 'Name', 'Date',
+                         'Original Number of Punches', 'Number of Cleaned Punches',
+                         'First Punch Time', 'Last Punch Time',
+                         'Total Shift Duration', 'Total Break Duration',
+                         'Daily_More_T_Hours', 'Daily_Short_T_Hours',
+                         'is_more_t_day', 'is_short_t_day',
+                         'More_T_postMID',
+                         'Punch Status']
+# What the shift builders return per day: the report columns plus the last punch Timestamp and,
+# from the general builder, the raw shift length and thresholds More-T / Short-T are derived from
+_DAILY_RECORD_COLUMNS = _DAILY_REPORT_COLUMNS + ['Last Punch DT', 'Total Shift Seconds', 'More_T_Enabled',
+                                                 'More_T_Start_Hours', 'Short_T_Threshold_Hours']
+
+# Punches closer than this to the last kept punch (with the same status) are duplicates
+_CONSOLIDATION_WINDOW_NS = pd.Timedelta(minutes=10).value
+
+def _consolidated_punch_mask(group_ids: np.ndarray, times_ns: np.ndarray, status_codes) -> np.ndarray:
+    """
+    Boolean mask of the punches kept by the 10-minute consolidation, for rows sorted by
+    (group, time). The first punch of a group is always kept; a later punch is kept when it
+    is more than 10 minutes after the last *kept* punch or its status differs from it, and
+    the last punch is kept unless it repeats the last kept one exactly (pairs always survive).
+    A punch more than 10 minutes after its predecessor is therefore always kept, so only
+    groups with a shorter gap somewhere need the sequential walk.
+    """
+    n = len(times_ns)
+    keep = np.ones(n, dtype=bool)
+    if n == 0:
+        return keep
+
+    is_first = np.empty(n, dtype=bool)
+    is_first[0] = True
+    is_first[1:] = group_ids[1:] != group_ids[:-1]
+    gap = np.diff(times_ns, prepend=times_ns[0])
+    close = ~is_first & (gap <= _CONSOLIDATION_WINDOW_NS)
+    if not close.any():
+        return keep
+
+    starts = np.flatnonzero(is_first)
+    ends = np.append(starts[1:], n)
+    group_of_row = np.cumsum(is_first) - 1
+    times = times_ns.tolist()
+    codes = status_codes.tolist() if status_codes is not None else None
+
+    for g in np.unique(group_of_row[close]).tolist():
+        start, end = int(starts[g]), int(ends[g])
+        last_kept = start
+        for i in range(start + 1, end - 1):
+            if times[i] - times[last_kept] > _CONSOLIDATION_WINDOW_NS or \
+               (codes is not None and codes[i] != codes[last_kept]):
+                last_kept = i
+            else:
+                keep[i] = False
+        i = end - 1
+        if i > start and last_kept != start and times[i] == times[last_kept] and \
+           (codes is None or codes[i] == codes[last_kept]):
+            keep[i] = False
+    return keep
+
 class FingerprintProcessor:
     """
     A dedicated class to process fingerprint data for all companies,
@@ -44,10 +195,13 @@ class FingerprintProcessor:
         self.true_global_min_date = None # Earliest date across all RAW data
         self.true_global_max_date = None # Latest date across all RAW data
         self.error_log = [] # To store any processing errors
+        self._workbook_cache = {} # sha1(file bytes) -> parsed sheet (or read error), for the current upload batch
+        self._debug = False # st.session_state['debug_mode'], read once per calculate_daily_reports run
 
 
 
-    def _process_single_file(self, uploaded_file: st.runtime.uploaded_file_manager.UploadedFile) -> pd.DataFrame:
+    def _process_single_file(self, uploaded_file: st.runtime.uploaded_file_manager.UploadedFile,
+                             file_warnings: list) -> tuple[pd.DataFrame, bool]:
         """
         Reads a single uploaded fingerprint file (CSV or Excel),
         adds a 'Source_Name' column, and converts the 'Date/Time' column to datetime objects.
@@ -56,18 +210,28 @@ class FingerprintProcessor:
         Args:
             uploaded_file (streamlit.runtime.uploaded_file_manager.UploadedFile):
                 The uploaded file object from Streamlit.
+            file_warnings (list): Non-blocking error-log entries for this file are appended here;
+                the method itself changes no processor state, so it can run on a worker thread.
 
         Returns:
-            pd.DataFrame: A DataFrame with the processed data.
+            tuple[pd.DataFrame, bool]: The processed data, and whether the file had a Status column.
         """
         file_extension = os.path.splitext(uploaded_file.name)[1].lower()
         df = pd.DataFrame()
 
         try:
             if file_extension == '.csv':
-                df = pd.read_csv(io.StringIO(uploaded_file.getvalue().decode('utf-8')))
+                df = _read_upload_csv(uploaded_file.getvalue())
             elif file_extension in ['.xls', '.xlsx']:
-                df = pd.read_excel(io.BytesIO(uploaded_file.getvalue()))
+                # process_uploaded_files parses each distinct workbook of the batch up front;
+                # a file processed on its own is parsed here
+                file_bytes = uploaded_file.getvalue()
+                sheet = self._workbook_cache.get(hashlib.sha1(file_bytes).digest())
+                if sheet is None:
+                    sheet = pd.read_excel(io.BytesIO(file_bytes))
+                elif isinstance(sheet, Exception):
+                    raise sheet
+                df = sheet.copy()
             else:
                 raise ValueError(
                     f"Unsupported file type for '{uploaded_file.name}'. "
@@ -79,37 +243,38 @@ class FingerprintProcessor:
             )
 
         # Drop any columns that are unnamed (often generated from empty cells in Excel/CSV headers)
-        df = df.loc[:, ~df.columns.str.contains('^Unnamed', na=False)]
-
-        # Normalize column names based on COLUMN_MAPPING
-        df_columns = df.columns.tolist()
-        status_found_for_file = False
-        for standard_col, possible_names in COLUMN_MAPPING.items():
-            found_match = False
-            for name_variant in possible_names:
-                if name_variant in df_columns:
-                    if standard_col != name_variant:
-                        df.rename(columns={name_variant: standard_col}, inplace=True)
-                    found_match = True
-                    if standard_col == 'Status':
-                        status_found_for_file = True
-                    break
-            if not found_match and standard_col in ['No.', 'Name', 'Date/Time']:
+        # (the C parser names them 'Unnamed: N', the pyarrow engine leaves them as '')
+        unnamed_columns = [col for col in df.columns if isinstance(col, str) and (col.startswith('Unnamed') or col == '')]
+        if unnamed_columns:
+            df = df.drop(columns=unnamed_columns)
+
+        # Normalize column names based on COLUMN_MAPPING: for each standard column the first alias
+        # present (in COLUMN_MAPPING order) is renamed; later aliases are left untouched.
+        present_columns = set(df.columns)
+        column_renames = {}
+        matched_standard_cols = set()
+        for name_variant, standard_col in COLUMN_ALIASES.items():
+            if name_variant in present_columns and standard_col not in matched_standard_cols:
+                matched_standard_cols.add(standard_col)
+                if name_variant != standard_col:
+                    column_renames[name_variant] = standard_col
+        if column_renames:
+            df = df.rename(columns=column_renames)
+
+        for standard_col in CRITICAL_COLUMNS:
+            if standard_col not in matched_standard_cols:
                 raise ValueError(
                     f"Missing critical column '{standard_col}' "
-                    f"(or its alternatives {possible_names}) in '{uploaded_file.name}'."
+                    f"(or its alternatives {COLUMN_MAPPING[standard_col]}) in '{uploaded_file.name}'."
                 )
-
-        # Update global_status_present if this file has a status column
-        if status_found_for_file:
-            self.global_status_present = True
+        status_found_for_file = 'Status' in matched_standard_cols
 
         # ------------------------------------------------------------------
         # NEW: Extract Source_Name from NUMERIC filename, fallback to legacy
         #      - New convention: <companyDigit><locationCode>.xlsx  (e.g. 117.xlsx)
         #      - First digit = company (1=D&H, 2=D&Co, 3=Second Cup, 4=Alhadaba)
         #      - Remaining digits = location code within that company
-        #      - We use selected_company_name + LOCATION_MAP to map locationCode → Source_Name
+        #      - We use selected_company_name + LOCATION_MAP (via LOCATION_BY_CODE) to map locationCode → Source_Name
         #      - If filename is not numeric OR code not found → fallback to old logic
         # ------------------------------------------------------------------
         filename = uploaded_file.name
@@ -121,37 +286,26 @@ class FingerprintProcessor:
             # Discard the first digit (company), keep the rest as location code
             location_code = base_name[1:]
 
-            # LOCATION_MAP is expected as: { "D&H": { "Etam Marina": "17", ... }, ... }
-            company_locations = LOCATION_MAP.get(self.selected_company_name, {})
-
-            matched_location_name = None
-            for loc_name, code_str in company_locations.items():
-                if str(code_str) == location_code:
-                    matched_location_name = loc_name
-                    break
+            # LOCATION_BY_CODE is keyed by (company, code), e.g. ("D&H", "17") → "Etam Marina"
+            matched_location_name = LOCATION_BY_CODE.get((self.selected_company_name, location_code))
 
             if matched_location_name:
                 source_name = matched_location_name
             else:
                 # Log but do not break the run; we will fallback to legacy parsing
-                self.error_log.append({
+                file_warnings.append({
                     "Filename": filename,
                     "Error": f"Unknown location code {location_code} for company {self.selected_company_name}"
                 })
 
         # 2) Fallback: legacy pattern ".xlsx - LocationName.xlsx" or plain base name
+        #    (resolved once per distinct filename; old files continue to work)
         if not source_name:
-            # Keep previous behaviour so old files continue to work
-            parts = filename.split('.xlsx - ')
-            if len(parts) > 1:
-                last_segment = parts[-1]
-                # Remove trailing extension (e.g., ".xlsx") from the last segment
-                source_name = last_segment.replace(os.path.splitext(last_segment)[1], '')
-            else:
-                # Simple fallback → just use the base filename without extension
-                source_name = base_name
+            source_name = _source_name_from_filename(filename)
 
-        df['Source_Name'] = str(source_name).strip()
+        # Interned: every later rules / date-format / store-ops lookup keys on this string
+        source_name = sys.intern(str(source_name).strip())
+        df['Source_Name'] = source_name
 
         # ------------------------------------------------------------------
         # Rest of original logic unchanged
@@ -165,20 +319,16 @@ class FingerprintProcessor:
             )
 
         try:
-            general_date_formats_to_try = [
-                '%d/%m/%Y %I:%M:%S %p', '%d/%m/%Y %I:%M %p',
-                '%d-%b-%y %I:%M:%S %p', '%d-%b-%y %I:%M %p',
-                '%m/%d/%Y %I:%M:%S %p', '%m/%d/%Y %I:%M %p',
-                '%d/%m/%y %I:%M:%S %p', '%d/%m/%y %I:%M %p',
-                '%H:%M:%S', '%H:%M',
-            ]
-            specific_format = FILE_DATE_FORMATS.get(str(source_name).strip())
-            date_formats_for_this_file = []
-            if specific_format:
-                date_formats_for_this_file.append(specific_format)
-            for fmt in general_date_formats_to_try:
-                if fmt not in date_formats_for_this_file:
-                    date_formats_for_this_file.append(fmt)
+            # The source's own format first, then the general fallbacks (cached per source).
+            # Without a configured format, a format inferred from the data goes first so a
+            # single-format file is parsed in one pass.
+            date_formats_for_this_file = date_formats_for_source(source_name)
+            if get_date_format(source_name) is None:
+                inferred_format = _infer_datetime_format(df['Date/Time'])
+                if inferred_format:
+                    date_formats_for_this_file = (inferred_format,) + tuple(
+                        fmt for fmt in date_formats_for_this_file if fmt != inferred_format
+                    )
 
             parsed_series = pd.Series(pd.NaT, index=df.index)
             original_datetime_col = df['Date/Time'].copy()
@@ -221,7 +371,7 @@ class FingerprintProcessor:
                 
                 if duration_days > 40:
                     # Attempt AUTO-CORRECT: Strict parsing with config format if available
-                    specific_format = FILE_DATE_FORMATS.get(str(source_name).strip())
+                    specific_format = get_date_format(source_name)
                     
                     if specific_format:
                         # If a specific format exists, we check if strictly parsing with ONLY that format
@@ -259,7 +409,10 @@ class FingerprintProcessor:
             df['Status'] = df['Status'].astype(str)
             df['Status'] = df['Status'].replace('nan', '').fillna('')
 
-        return df
+        # 'No.' as normalized strings in every file, so all frames share dtypes when concatenated
+        df['No.'] = df['No.'].map(normalize_employee_id)
+
+        return df, status_found_for_file
 
 
     def process_uploaded_files(self, uploaded_files: list) -> pd.DataFrame:
@@ -282,16 +435,49 @@ class FingerprintProcessor:
             self.error_log.append({'Filename': 'N/A', 'Error': 'No files uploaded to process.'})
             return pd.DataFrame()
 
+        # Excel uploads are keyed by content. Workbooks parsed by the previous Generate run are
+        # reused; every other distinct workbook is parsed exactly once, before the per-file work
+        # starts, so identical uploads in one batch share a single parse
+        batch_workbooks = {}
         for uploaded_file in uploaded_files:
+            if os.path.splitext(uploaded_file.name)[1].lower() in ('.xls', '.xlsx'):
+                batch_workbooks.setdefault(hashlib.sha1(uploaded_file.getvalue()).digest(), uploaded_file)
+        previous_workbooks = st.session_state.get('parsed_workbook_cache', {})
+        self._workbook_cache = {key: previous_workbooks[key] for key in batch_workbooks if key in previous_workbooks}
+        workbooks_to_parse = [key for key in batch_workbooks if key not in self._workbook_cache]
+
+        def read_upload(uploaded_file):
+            # Runs on a worker thread and touches no shared state: the data, the status flag, the
+            # file's warnings and any exception are returned, and merged below in upload order
+            file_warnings = []
             try:
-                df = self._process_single_file(uploaded_file)
+                df, status_found = self._process_single_file(uploaded_file, file_warnings)
+                return df, status_found, file_warnings, None
+            except Exception as e:
+                return None, False, file_warnings, e
+
+        with ThreadPoolExecutor(max_workers=min(FILE_READ_WORKERS, len(uploaded_files))) as ex:
+            parsed_sheets = ex.map(_read_workbook, (batch_workbooks[key].getvalue() for key in workbooks_to_parse))
+            self._workbook_cache.update(zip(workbooks_to_parse, parsed_sheets))
+            # The cache is complete before any worker reads it, and only read from here on
+            read_results = list(ex.map(read_upload, uploaded_files))
+
+        for uploaded_file, (df, status_found, file_warnings, e) in zip(uploaded_files, read_results):
+            self.global_status_present = self.global_status_present or status_found
+            self.error_log.extend(file_warnings)
+            if e is None:
                 list_of_dfs.append(df)
-            except self.DateRangeError as dre:
+            elif isinstance(e, self.DateRangeError):
                 # Collect blocking date range errors separately
-                blocking_errors.append(f"{uploaded_file.name}: {str(dre)}")
-            except Exception as e:
+                blocking_errors.append(f"{uploaded_file.name}: {str(e)}")
+            else:
                 error_message = f"Error processing {uploaded_file.name}: {type(e).__name__}: {e}"
                 self.error_log.append({'Filename': uploaded_file.name, 'Error': error_message})
+        # Only this batch's successfully parsed workbooks are carried over to the next run
+        st.session_state['parsed_workbook_cache'] = {
+            key: sheet for key, sheet in self._workbook_cache.items() if not isinstance(sheet, Exception)
+        }
+        self._workbook_cache = {}
 
         # If any blocking errors occurred, stop everything and return/raise specific structure
         if blocking_errors:
@@ -325,21 +511,18 @@ class FingerprintProcessor:
             # For other companies, apply the existing 1 AM rule for date adjustment
             # This rule shifts punches between 00:00 and 01:00 to the previous calendar day's shift.
             # It should NOT apply to the true global minimum date, as there's no previous day.
-            combined_df['Adjusted_Date'] = combined_df['Original_DateTime'].dt.date # Start with original date
-            
+            # Kept as datetime64 at midnight so the shift below is one vectorized subtraction
+            adjusted_date = combined_df['Original_DateTime'].dt.normalize() # Start with original date
+
             # Mask for punches occurring between 00:00 and 00:59:59 (based on ORIGINAL time)
-            mask_early_morning_window = (combined_df['Original_DateTime'].dt.hour >= 0) & \
-                                        (combined_df['Original_DateTime'].dt.hour < 1) & \
-                                        (combined_df['Original_DateTime'].dt.date != self.true_global_min_date)
+            mask_early_morning_window = (combined_df['Original_DateTime'].dt.hour < 1) & \
+                                        (adjusted_date != pd.Timestamp(self.true_global_min_date))
 
             # Apply 1 AM rule ONLY to 'C/Out' punches in the early morning
             mask_early_morning_out_punch = mask_early_morning_window & \
-                                           (combined_df['Status'].str.contains('C/Out', na=False))
-            combined_df.loc[mask_early_morning_out_punch, 'Adjusted_Date'] = combined_df.loc[mask_early_morning_out_punch, 'Adjusted_Date'] - timedelta(days=1)
-            combined_df['Date'] = combined_df['Adjusted_Date']
-            combined_df.drop(columns=['Adjusted_Date'], inplace=True)
-
-        combined_df['No.'] = combined_df['No.'].apply(normalize_employee_id) # Ensure 'No.' is string for consistent grouping
+                                           (combined_df['Status'].str.contains('C/Out', na=False, regex=False))
+            adjusted_date = adjusted_date - pd.to_timedelta(mask_early_morning_out_punch.astype('int64'), unit='D')
+            combined_df['Date'] = adjusted_date.dt.date
 
         return combined_df
 
@@ -350,7 +533,9 @@ class FingerprintProcessor:
         based on punch count, status, and consolidation rules.
         This function now uses 'Original_DateTime' for all time-based calculations.
         """
-        group = group.sort_values(by='Original_DateTime').reset_index(drop=True) # Sort by Original_DateTime
+        # Groups from calculate_daily_reports arrive sorted; the slice is only read, never copied
+        if not group['Original_DateTime'].is_monotonic_increasing:
+            group = group.sort_values(by='Original_DateTime', kind='stable') # Sort by Original_DateTime
 
         employee_no = str(group['No.'].iloc[0]) # Corrected: Changed 'No' to 'No.'
         employee_name = group['Name'].iloc[0]
@@ -359,12 +544,12 @@ class FingerprintProcessor:
 
         effective_rules = get_effective_rules_for_employee_day(self.selected_company_name, employee_no, source_name)
 
-        standard_shift_hours = effective_rules.get("standard_shift_hours", 8)
-        short_t_threshold_hours = effective_rules.get("short_t_threshold_hours", 7.5)
-        more_t_start_hours = effective_rules.get("more_t_start_hours", 9)
-        more_t_enabled = effective_rules.get("more_t_enabled", True) # Default to True if not specified
-        fixed_break_deduction_minutes = effective_rules.get("fixed_break_deduction_minutes", 0) # New rule
-        fixed_break_threshold_hours = effective_rules.get("fixed_break_threshold_hours", 0) # New rule
+        standard_shift_hours = effective_rules.standard_shift_hours
+        short_t_threshold_hours = effective_rules.short_t_threshold_hours
+        more_t_start_hours = effective_rules.more_t_start_hours
+        more_t_enabled = effective_rules.more_t_enabled
+        fixed_break_deduction_minutes = effective_rules.fixed_break_deduction_minutes
+        fixed_break_threshold_hours = effective_rules.fixed_break_threshold_hours
 
         if group.empty:
             return {
@@ -374,33 +559,22 @@ class FingerprintProcessor:
                 'Total Shift Duration': '00:00:00', 'Total Break Duration': '00:00:00',
                 'Daily_More_T_Hours': '00:00:00', 'Daily_Short_T_Hours': '00:00:00',
                 'is_more_t_day': False, 'is_short_t_day': False,
-                'Punch Status': 'No valid punches for day', 'More_T_postMID': '00:00:00'
+                'Punch Status': 'No valid punches for day', 'More_T_postMID': '00:00:00',
+                'Last Punch DT': pd.NaT
             }
 
         original_punch_count = len(group)
 
-        # --- Universal Cleaning: Always keep first and last punch, apply 10-min consolidation for others ---
-        consolidated_punches_list = []
-        if not group.empty:
-            consolidated_punches_list.append(group.iloc[0])
-            for i in range(1, original_punch_count - 1):
-                current_punch = group.iloc[i]
-                last_kept_punch = consolidated_punches_list[-1]
-                # Use Original_DateTime for consolidation logic
-                if (current_punch['Original_DateTime'] - last_kept_punch['Original_DateTime']) > pd.Timedelta(minutes=10) or \
-                   (status_column_was_present and current_punch['Status'] != last_kept_punch['Status']):
-                    consolidated_punches_list.append(current_punch)
-            
-            if original_punch_count > 1 and \
-               (group.iloc[-1]['Original_DateTime'] != consolidated_punches_list[-1]['Original_DateTime'] or \
-               (status_column_was_present and group.iloc[-1]['Status'] != consolidated_punches_list[-1]['Status'])):
-                consolidated_punches_list.append(group.iloc[-1])
-            if original_punch_count > 1 and len(consolidated_punches_list) == 1:
-                consolidated_punches_list.append(group.iloc[-1])
-
-        cleaned_group = pd.DataFrame(consolidated_punches_list)
+        # --- Universal Cleaning: first/last punch kept, 10-min consolidation already marked in 'Keep_Punch' ---
+        cleaned_group = group[group['Keep_Punch']]
         cleaned_punch_count = len(cleaned_group)
 
+        # Positional arrays of the kept punches; intervals[i] is the gap from punch i to punch i+1
+        punch_times = cleaned_group['Original_DateTime'].to_numpy(dtype='datetime64[ns]')
+        raw_statuses = cleaned_group['Status'].to_numpy(dtype=object)
+        statuses = tuple(str(status).strip().lower() for status in raw_statuses)
+        intervals = pd.to_timedelta(np.diff(punch_times))
+
         total_shift_duration = pd.Timedelta(seconds=0)
         total_break_duration = pd.Timedelta(seconds=0)
         punch_status = "N/A"
@@ -409,10 +583,12 @@ class FingerprintProcessor:
 
         first_punch_time_formatted = 'N/A'
         last_punch_time_formatted = 'N/A'
+        last_punch_dt = pd.NaT
 
         if not group.empty:
             first_punch_time_formatted = group.iloc[0]['Original_DateTime'].strftime('%I:%M:%S %p')
-            last_punch_time_formatted = group.iloc[-1]['Original_DateTime'].strftime('%I:%M:%S %p')
+            last_punch_dt = group.iloc[-1]['Original_DateTime']
+            last_punch_time_formatted = last_punch_dt.strftime('%I:%M:%S %p')
 
         if cleaned_punch_count == 0:
             punch_status = "No valid punches for day"
@@ -424,20 +600,16 @@ class FingerprintProcessor:
         elif cleaned_punch_count >= 2:
             is_status_alternating_useful = False
             if status_column_was_present and cleaned_punch_count >= 2:
-                if any(cleaned_group.iloc[i]['Status'] != cleaned_group.iloc[i+1]['Status'] for i in range(len(cleaned_group) - 1)):
+                if (raw_statuses[1:] != raw_statuses[:-1]).any():
                     is_status_alternating_useful = True
             
             # --- START: Modified Logic for 3 punches with status ---
             if cleaned_punch_count == 3 and status_column_was_present:
                 # Check for specific 3-punch patterns
-                first_status = str(cleaned_group.iloc[0]['Status']).strip().lower()
-                second_status = str(cleaned_group.iloc[1]['Status']).strip().lower()
-                third_status = str(cleaned_group.iloc[2]['Status']).strip().lower()
-
-                if first_status == 'c/in' and second_status == 'c/out' and third_status == 'c/in':
+                if statuses == ('c/in', 'c/out', 'c/in'):
                     # Pattern: C/In -> C/Out -> C/In (Open shift with a break)
-                    shift1 = cleaned_group.iloc[1]['Original_DateTime'] - cleaned_group.iloc[0]['Original_DateTime']
-                    break1 = cleaned_group.iloc[2]['Original_DateTime'] - cleaned_group.iloc[1]['Original_DateTime']
+                    shift1 = intervals[0]
+                    break1 = intervals[1]
                     
                     total_shift_duration = shift1
                     total_break_duration = break1
@@ -445,10 +617,10 @@ class FingerprintProcessor:
                     individual_interval_details.append({'type': 'Shift', 'duration': shift1})
                     individual_interval_details.append({'type': 'Break', 'duration': break1})
                     has_inferred_shifts_breaks_pattern = True
-                elif first_status == 'c/out' and second_status == 'c/in' and third_status == 'c/out':
+                elif statuses == ('c/out', 'c/in', 'c/out'):
                     # Pattern: C/Out -> C/In -> C/Out (Desired: Total Presence, 0 Break)
                     # This is the case for Edlemar P. Ulli.
-                    total_shift_duration = cleaned_group.iloc[-1]['Original_DateTime'] - cleaned_group.iloc[0]['Original_DateTime']
+                    total_shift_duration = pd.Timedelta(punch_times[-1] - punch_times[0])
                     total_break_duration = pd.Timedelta(seconds=0) # Explicitly zero break
                     punch_status = f"Total Presence (3 Cleaned Punches, C/Out-C/In-C/Out Pattern)"
                     individual_interval_details.append({'type': 'Total Presence', 'duration': total_shift_duration})
@@ -460,15 +632,9 @@ class FingerprintProcessor:
             # --- END: Modified Logic for 3 punches with status ---
 
             if is_status_alternating_useful and not has_inferred_shifts_breaks_pattern: # Only proceed if not handled by specific 3-punch logic
-                if cleaned_punch_count == 4 and \
-                   str(cleaned_group.iloc[0]['Status']).strip().lower() == 'c/in' and \
-                   str(cleaned_group.iloc[1]['Status']).strip().lower() == 'c/out' and \
-                   str(cleaned_group.iloc[2]['Status']).strip().lower() == 'c/in' and \
-                   str(cleaned_group.iloc[3]['Status']).strip().lower() == 'c/out':
+                if statuses == ('c/in', 'c/out', 'c/in', 'c/out'):
                     
-                    shift1 = cleaned_group.iloc[1]['Original_DateTime'] - cleaned_group.iloc[0]['Original_DateTime'] # Use Original_DateTime
-                    break1 = cleaned_group.iloc[2]['Original_DateTime'] - cleaned_group.iloc[1]['Original_DateTime'] # Use Original_DateTime
-                    shift2 = cleaned_group.iloc[3]['Original_DateTime'] - cleaned_group.iloc[2]['Original_DateTime'] # Use Original_DateTime
+                    shift1, break1, shift2 = intervals[0], intervals[1], intervals[2]
                     
                     total_shift_duration = shift1 + shift2
                     total_break_duration = break1
@@ -479,10 +645,9 @@ class FingerprintProcessor:
                     has_inferred_shifts_breaks_pattern = True
                 else:
                     # General loop for alternating statuses
-                    for i in range(len(cleaned_group) - 1):
-                        interval = cleaned_group.iloc[i+1]['Original_DateTime'] - cleaned_group.iloc[i]['Original_DateTime'] # Use Original_DateTime
-                        current_status = str(cleaned_group.iloc[i]['Status']).strip().lower()
-                        next_status = str(cleaned_group.iloc[i+1]['Status']).strip().lower()
+                    for i, interval in enumerate(intervals):
+                        current_status = statuses[i]
+                        next_status = statuses[i+1]
 
                         if 'c/in' in current_status and 'c/out' in next_status:
                             individual_interval_details.append({'type': 'Shift', 'duration': interval})
@@ -502,9 +667,7 @@ class FingerprintProcessor:
                         has_inferred_shifts_breaks_pattern = True
             
             if not has_inferred_shifts_breaks_pattern and cleaned_punch_count >= 4:
-                inferred_shift1 = cleaned_group.iloc[1]['Original_DateTime'] - cleaned_group.iloc[0]['Original_DateTime'] # Use Original_DateTime
-                inferred_break1 = cleaned_group.iloc[2]['Original_DateTime'] - cleaned_group.iloc[1]['Original_DateTime'] # Use Original_DateTime
-                inferred_shift2 = cleaned_group.iloc[3]['Original_DateTime'] - cleaned_group.iloc[2]['Original_DateTime'] # Use Original_DateTime
+                inferred_shift1, inferred_break1, inferred_shift2 = intervals[0], intervals[1], intervals[2]
 
                 total_shift_duration = inferred_shift1 + inferred_shift2
                 total_break_duration = inferred_break1
@@ -517,14 +680,13 @@ class FingerprintProcessor:
                 
                 if cleaned_punch_count > 4:
                     punch_status += " (+ additional punches beyond 4th)"
-                    for i in range(3, cleaned_punch_count - 1): 
-                        interval = cleaned_group.iloc[i+1]['Original_DateTime'] - cleaned_group.iloc[i]['Original_DateTime'] # Use Original_DateTime
+                    for interval in intervals[3:]:
                         individual_interval_details.append({'type': 'General', 'duration': interval})
                 
                 has_inferred_shifts_breaks_pattern = True
 
             if not has_inferred_shifts_breaks_pattern: # Fallback if no specific pattern was inferred or status was not useful
-                total_shift_duration = cleaned_group.iloc[-1]['Original_DateTime'] - cleaned_group.iloc[0]['Original_DateTime'] # Use Original_DateTime
+                total_shift_duration = pd.Timedelta(punch_times[-1] - punch_times[0])
                 total_break_duration = pd.Timedelta(seconds=0)
                 punch_status = f"Total Presence ({cleaned_punch_count} Cleaned Punches, No Inferred Breaks/Unclear Patterns)"
                 individual_interval_details = []
@@ -546,24 +708,6 @@ class FingerprintProcessor:
                 total_shift_duration = pd.Timedelta(seconds=0)
                 punch_status += " (Fixed Break Deducted, Shift Zeroed)"
 
-        daily_more_t_td = pd.Timedelta(seconds=0)
-        daily_short_t_td = pd.Timedelta(seconds=0)
-        is_more_t_day = False
-        is_short_t_day = False
-
-        total_shift_hours = total_shift_duration.total_seconds() / 3600.0
-
-        if more_t_enabled:
-            if total_shift_hours > more_t_start_hours:
-                daily_more_t_td = pd.Timedelta(hours=total_shift_hours - more_t_start_hours)
-                if daily_more_t_td > pd.Timedelta(seconds=0):
-                    is_more_t_day = True
-        
-        if total_shift_hours < short_t_threshold_hours and total_shift_hours > 0:
-            daily_short_t_td = pd.Timedelta(hours=short_t_threshold_hours - total_shift_hours)
-            if daily_short_t_td > pd.Timedelta(seconds=0):
-                is_short_t_day = True
-
         intervals_output_dict = {}
         shift_col_count = 0
         break_col_count = 0
@@ -573,29 +717,31 @@ class FingerprintProcessor:
             for item in individual_interval_details:
                 if item['type'] == 'Shift':
                     shift_col_count += 1
-                    intervals_output_dict[f'Shift {shift_col_count} Duration'] = format_timedelta_to_hms(item['duration'])
+                    intervals_output_dict[f'Shift {shift_col_count} Duration'] = _format_hms(item['duration'])
                 elif item['type'] == 'Break':
                     break_col_count += 1
-                    intervals_output_dict[f'Break {break_col_count} Duration'] = format_timedelta_to_hms(item['duration'])
+                    intervals_output_dict[f'Break {break_col_count} Duration'] = _format_hms(item['duration'])
                 else:
                     general_col_count += 1
-                    intervals_output_dict[f'Interval {general_col_count} Duration'] = format_timedelta_to_hms(item['duration'])
+                    intervals_output_dict[f'Interval {general_col_count} Duration'] = _format_hms(item['duration'])
 
         return_data = {
             'No.': employee_no, 'Name': employee_name, 'Date': current_date, 'Source_Name': source_name,
             'Original Number of Punches': original_punch_count,
             'Number of Cleaned Punches': cleaned_punch_count,
             'First Punch Time': first_punch_time_formatted, 'Last Punch Time': last_punch_time_formatted,
-            'Total Shift Duration': format_timedelta_to_hms(total_shift_duration),
-            'Total Break Duration': format_timedelta_to_hms(total_break_duration),
-            'Daily_More_T_Hours': format_timedelta_to_hms(daily_more_t_td),
-            'Daily_Short_T_Hours': format_timedelta_to_hms(daily_short_t_td),
-            'is_more_t_day': is_more_t_day, 'is_short_t_day': is_short_t_day,
-            'Punch Status': punch_status, 'More_T_postMID': '00:00:00'
+            'Total Shift Duration': _format_hms(total_shift_duration),
+            'Total Break Duration': _format_hms(total_break_duration),
+            # More-T / Short-T are derived for the whole report in calculate_daily_reports
+            'Total Shift Seconds': total_shift_duration.total_seconds(),
+            'More_T_Enabled': more_t_enabled, 'More_T_Start_Hours': more_t_start_hours,
+            'Short_T_Threshold_Hours': short_t_threshold_hours,
+            'Punch Status': punch_status, 'More_T_postMID': '00:00:00',
+            'Last Punch DT': last_punch_dt
         }
         return_data.update(intervals_output_dict)
 
-        if st.session_state.get('debug_mode', False):
+        if self._debug:
             st.write(f"DEBUG (Non-Second Cup Shift Details): Employee {employee_no}, Date {current_date}")
             st.write(f"  Original Punches: {original_punch_count}")
             st.write(f"  Cleaned Punches: {cleaned_punch_count}")
@@ -612,7 +758,7 @@ class FingerprintProcessor:
         Calculates detailed daily reports from the combined and initially processed DataFrame
         using company-specific shift calculation logic.
         """
-        daily_report_list = []
+        self._debug = bool(st.session_state.get('debug_mode', False))
         if combined_df.empty:
             return pd.DataFrame()
 
@@ -622,188 +768,176 @@ class FingerprintProcessor:
             self.error_log.append({'Filename': 'Combined Data', 'Error': f"Cannot group data: Missing one or more grouping columns ({', '.join(missing)})."})
             return pd.DataFrame()
 
-        # Process employee by employee to handle chaining correctly
-        for emp_no, emp_group_full in combined_df.groupby('No.'):
+        # Mark the punches surviving the 10-minute consolidation for every (employee, day) at once
+        combined_df = combined_df.sort_values(by=['No.', 'Date', 'Original_DateTime'], kind='stable').reset_index(drop=True)
+        status_codes = pd.factorize(combined_df['Status'])[0] if self.global_status_present else None
+        combined_df['Keep_Punch'] = _consolidated_punch_mask(
+            combined_df.groupby(['No.', 'Date'], sort=False).ngroup().to_numpy(),
+            combined_df['Original_DateTime'].to_numpy(dtype='datetime64[ns]').view('i8'),
+            status_codes
+        )
+
+        # Employees whose primary location (the source of their earliest punch) is a Second Cup
+        # 24-hour site are paired across days; everyone else is reported (employee, day) by day.
+        twenty_four_hour_emps = set()
+        if self.selected_company_name == "Second Cup":
+            first_punches = combined_df.loc[combined_df.groupby('No.')['Original_DateTime'].idxmin(), ['No.', 'Source_Name']]
+            twenty_four_hour_emps = {
+                emp_no for emp_no, source_name in zip(first_punches['No.'], first_punches['Source_Name'])
+                if get_effective_rules_for_employee_day(self.selected_company_name, emp_no, source_name).is_24_hour_location
+            }
+        is_24_hour_row = combined_df['No.'].isin(twenty_four_hour_emps)
+        reports_by_employee = {}
+
+        # Process 24-hour employees one by one to handle chaining across days correctly
+        for emp_no, emp_group_full in combined_df[is_24_hour_row].groupby('No.'):
             # Ensure the full employee group is sorted by Original_DateTime for sequential processing
-            emp_group_full_sorted = emp_group_full.sort_values(by='Original_DateTime').reset_index(drop=True)
-            
-            # Get effective rules for the current employee's primary location
-            # Assuming the first Source_Name in the sorted group is representative for rules lookup
-            # For simplicity, we'll use the Source_Name of the first punch in the group.
+            emp_group_full_sorted = emp_group_full.sort_values(by='Original_DateTime', kind='stable').reset_index(drop=True)
             primary_source_name = emp_group_full_sorted['Source_Name'].iloc[0]
-            effective_rules = get_effective_rules_for_employee_day(self.selected_company_name, emp_no, primary_source_name)
-
-            is_24_hour_location = effective_rules.get("is_24_hour_location", False)
 
-            if self.selected_company_name == "Second Cup" and is_24_hour_location:
-                # For 24-hour Second Cup locations, first get the calculated shifts
-                calculated_shifts = calculate_24_hour_shifts(emp_group_full_sorted, emp_no, self.selected_company_name)
+            # For 24-hour Second Cup locations, first get the calculated shifts
+            calculated_shifts = calculate_24_hour_shifts(emp_group_full_sorted, emp_no, self.selected_company_name)
                 
-                # Create a DataFrame from calculated shifts
-                calculated_shifts_df = pd.DataFrame(calculated_shifts)
+            # Create a DataFrame from calculated shifts
+            calculated_shifts_df = pd.DataFrame(calculated_shifts)
 
-                # Get all unique dates for this employee from the original data
-                all_employee_dates = emp_group_full_sorted['Date'].unique()
+            # Get all unique dates for this employee from the original data
+            all_employee_dates = emp_group_full_sorted['Date'].unique()
                 
-                # Create a base DataFrame with one entry for each unique date, initialized to zero duration
-                base_daily_entries = []
-                for current_date in sorted(all_employee_dates):
-                    base_daily_entries.append({
-                        'No.': emp_no,
-                        'Name': emp_group_full_sorted['Name'].iloc[0], # Name is consistent for the employee
-                        'Date': current_date,
-                        'Source_Name': primary_source_name,
-                        'Original Number of Punches': 0, # Will be updated during merge
-                        'Number of Cleaned Punches': 0,  # Will be updated during merge
-                        'First Punch Time': 'N/A',
-                        'Last Punch Time': 'N/A',
-                        'Total Shift Duration': '00:00:00',
-                        'Total Break Duration': '00:00:00',
-                        'Daily_More_T_Hours': '00:00:00',
-                        'Daily_Short_T_Hours': '00:00:00',
-                        'is_more_t_day': False,
-                        'is_short_t_day': False,
-                        'More_T_postMID': '00:00:00',
-                        'Punch Status': 'No valid punches for day' # Default status
-                    })
-                base_daily_df = pd.DataFrame(base_daily_entries)
-
-                # Merge the calculated shifts into the base daily entries
-                # Use 'Date' and 'No.' as keys for merging
-                # This will update rows where shifts were calculated and keep default for others
-                merged_daily_df = pd.merge(
-                    base_daily_df,
-                    calculated_shifts_df,
-                    on=['No.', 'Name', 'Date', 'Source_Name'], # Merge on common identifying columns
-                    how='left',
-                    suffixes=('_base', '') # Keep original column names from calculated_shifts_df
-                )
+            # Create a base DataFrame with one entry for each unique date, initialized to zero duration
+            base_daily_entries = []
+            for current_date in sorted(all_employee_dates):
+                base_daily_entries.append({
+                    'No.': emp_no,
+                    'Name': emp_group_full_sorted['Name'].iloc[0], # Name is consistent for the employee
+                    'Date': current_date,
+                    'Source_Name': primary_source_name,
+                    'Original Number of Punches': 0, # Will be updated during merge
+                    'Number of Cleaned Punches': 0,  # Will be updated during merge
+                    'First Punch Time': 'N/A',
+                    'Last Punch Time': 'N/A',
+                    'Total Shift Duration': '00:00:00',
+                    'Total Break Duration': '00:00:00',
+                    'Daily_More_T_Hours': '00:00:00',
+                    'Daily_Short_T_Hours': '00:00:00',
+                    'is_more_t_day': False,
+                    'is_short_t_day': False,
+                    'More_T_postMID': '00:00:00',
+                    'Punch Status': 'No valid punches for day' # Default status
+                })
+            base_daily_df = pd.DataFrame(base_daily_entries)
+
+            # Merge the calculated shifts into the base daily entries
+            # Use 'Date' and 'No.' as keys for merging
+            # This will update rows where shifts were calculated and keep default for others
+            merged_daily_df = pd.merge(
+                base_daily_df,
+                calculated_shifts_df,
+                on=['No.', 'Name', 'Date', 'Source_Name'], # Merge on common identifying columns
+                how='left',
+                suffixes=('_base', '') # Keep original column names from calculated_shifts_df
+            )
                 
-                # Fill NaN values in columns that might not be present in base_daily_df for days without calculated shifts
-                # This ensures that columns like 'Original Number of Punches' from calculated_shifts_df are used
-                # and defaults are applied for days without calculated shifts.
-                for col in calculated_shifts_df.columns:
-                    if col not in ['No.', 'Name', 'Date', 'Source_Name']:
-                        # Use the value from the calculated shift if available, otherwise keep the base value
-                        merged_daily_df[col] = merged_daily_df[col].fillna(merged_daily_df[f"{col}_base"]) if f"{col}_base" in merged_daily_df.columns else merged_daily_df[col]
-                        if f"{col}_base" in merged_daily_df.columns:
-                            merged_daily_df.drop(columns=[f"{col}_base"], inplace=True)
-
-                # Ensure Punch Status for days not covered by calculated_shifts_df is 'No valid punches for day'
-                # This handles cases where a day had punches but calculate_24_hour_shifts didn't return an entry for it
-                # (e.g., a single C/Out that wasn't removed by the 2-7 AM rule, or a C/In that couldn't pair).
-                merged_daily_df['Punch Status'] = merged_daily_df['Punch Status'].fillna('No valid punches for day')
-                merged_daily_df['Original Number of Punches'] = merged_daily_df['Original Number of Punches'].fillna(0).astype(int)
-                merged_daily_df['Number of Cleaned Punches'] = merged_daily_df['Number of Cleaned Punches'].fillna(0).astype(int)
-                merged_daily_df['First Punch Time'] = merged_daily_df['First Punch Time'].fillna('N/A')
-                merged_daily_df['Last Punch Time'] = merged_daily_df['Last Punch Time'].fillna('N/A')
-                merged_daily_df['Total Shift Duration'] = merged_daily_df['Total Shift Duration'].fillna('00:00:00')
-                merged_daily_df['Total Break Duration'] = merged_daily_df['Total Break Duration'].fillna('00:00:00')
-                merged_daily_df['Daily_More_T_Hours'] = merged_daily_df['Daily_More_T_Hours'].fillna('00:00:00')
-                merged_daily_df['Daily_Short_T_Hours'] = merged_daily_df['Daily_Short_T_Hours'].fillna('00:00:00')
-                merged_daily_df['is_more_t_day'] = merged_daily_df['is_more_t_day'].fillna(False)
-                merged_daily_df['is_short_t_day'] = merged_daily_df['is_short_t_day'].fillna(False)
-                merged_daily_df['More_T_postMID'] = merged_daily_df['More_T_postMID'].fillna('00:00:00')
-
-
-                daily_report_list.extend(merged_daily_df.to_dict('records'))
-
-            else:
-                # For ALL other companies AND general Second Cup locations (non-24hr),
-                # use the global shift calculation logic.
-                unique_adjusted_dates = emp_group_full_sorted['Date'].unique()
-                for current_adjusted_date in sorted(unique_adjusted_dates):
-                    daily_group_for_current_date = emp_group_full_sorted[emp_group_full_sorted['Date'] == current_adjusted_date].copy()
-                    detailed_info = self._calculate_non_second_cup_shift_details(
-                        daily_group_for_current_date, 
-                        self.global_status_present # Pass the global status flag
-                    )
-                    daily_report_list.append(detailed_info)
-
-        daily_report = pd.DataFrame(daily_report_list)
-
-        # Define all fixed columns that should always be present
-        fixed_cols = ['Source_Name', 'No.', 'Name', 'Date', 
-                      'Original Number of Punches', 'Number of Cleaned Punches',
-                      'First Punch Time', 'Last Punch Time',
-                      'Total Shift Duration', 'Total Break Duration',
-                      'Daily_More_T_Hours', 'Daily_Short_T_Hours',
-                      'is_more_t_day', 'is_short_t_day',
-                      'More_T_postMID',
-                      'Punch Status']
-        
-        # Reindex to ensure all fixed columns are present, filling missing with NaN
-        daily_report = daily_report.reindex(columns=daily_report.columns.union(fixed_cols, sort=False))
-
-
-        for col in daily_report.columns:
-            if 'Duration' in col or 'Hours' in col or 'More_T_postMID' in col:
-                daily_report[col] = daily_report[col].fillna('00:00:00')
-            elif 'is_more_t_day' in col or 'is_short_t_day' in col:
-                 daily_report[col] = daily_report[col].fillna(False)
-            elif col in ['First Punch Time', 'Last Punch Time', 'Punch Status']:
-                daily_report[col] = daily_report[col].fillna('N/A')
-            elif col in ['Original Number of Punches', 'Number of Cleaned Punches']:
-                daily_report[col] = daily_report[col].fillna(0).astype(int)
+            # Fill NaN values in columns that might not be present in base_daily_df for days without calculated shifts
+            # This ensures that columns like 'Original Number of Punches' from calculated_shifts_df are used
+            # and defaults are applied for days without calculated shifts.
+            for col in calculated_shifts_df.columns:
+                if col not in ['No.', 'Name', 'Date', 'Source_Name']:
+                    # Use the value from the calculated shift if available, otherwise keep the base value
+                    merged_daily_df[col] = merged_daily_df[col].fillna(merged_daily_df[f"{col}_base"]) if f"{col}_base" in merged_daily_df.columns else merged_daily_df[col]
+                    if f"{col}_base" in merged_daily_df.columns:
+                        merged_daily_df.drop(columns=[f"{col}_base"], inplace=True)
+
+            # Ensure Punch Status for days not covered by calculated_shifts_df is 'No valid punches for day'
+            # This handles cases where a day had punches but calculate_24_hour_shifts didn't return an entry for it
+            # (e.g., a single C/Out that wasn't removed by the 2-7 AM rule, or a C/In that couldn't pair).
+            merged_daily_df['Punch Status'] = merged_daily_df['Punch Status'].fillna('No valid punches for day')
+            merged_daily_df['Original Number of Punches'] = merged_daily_df['Original Number of Punches'].fillna(0).astype(int)
+            merged_daily_df['Number of Cleaned Punches'] = merged_daily_df['Number of Cleaned Punches'].fillna(0).astype(int)
+            merged_daily_df['First Punch Time'] = merged_daily_df['First Punch Time'].fillna('N/A')
+            merged_daily_df['Last Punch Time'] = merged_daily_df['Last Punch Time'].fillna('N/A')
+            merged_daily_df['Total Shift Duration'] = merged_daily_df['Total Shift Duration'].fillna('00:00:00')
+            merged_daily_df['Total Break Duration'] = merged_daily_df['Total Break Duration'].fillna('00:00:00')
+            merged_daily_df['Daily_More_T_Hours'] = merged_daily_df['Daily_More_T_Hours'].fillna('00:00:00')
+            merged_daily_df['Daily_Short_T_Hours'] = merged_daily_df['Daily_Short_T_Hours'].fillna('00:00:00')
+            merged_daily_df['is_more_t_day'] = merged_daily_df['is_more_t_day'].fillna(False)
+            merged_daily_df['is_short_t_day'] = merged_daily_df['is_short_t_day'].fillna(False)
+            merged_daily_df['More_T_postMID'] = merged_daily_df['More_T_postMID'].fillna('00:00:00')
+
+
+            reports_by_employee[emp_no] = merged_daily_df.to_dict('records')
+
+        # For ALL other companies AND general Second Cup locations (non-24hr), use the global
+        # shift calculation logic on each (employee, adjusted day) slice of the sorted frame.
+        for (emp_no, current_adjusted_date), daily_group_for_current_date in \
+                combined_df[~is_24_hour_row].groupby(['No.', 'Date'], sort=True):
+            detailed_info = self._calculate_non_second_cup_shift_details(
+                daily_group_for_current_date,
+                self.global_status_present # Pass the global status flag
+            )
+            reports_by_employee.setdefault(emp_no, []).append(detailed_info)
+
+        # Employees in 'No.' order, each employee's days in date order
+        daily_report_list = [
+            record for emp_no in sorted(reports_by_employee) for record in reports_by_employee[emp_no]
+        ]
+
+        # Both shift builders return every report column, so one construction with a fixed column
+        # list is enough; per-interval breakdown keys are not part of the report and are dropped here.
+        daily_report = pd.DataFrame.from_records(daily_report_list, columns=_DAILY_RECORD_COLUMNS)
+
+        # More-T beyond the start threshold, Short-T under the short threshold, for every general row
+        # at once. hours * 3600 * 1e9 truncated is exactly what pd.Timedelta(hours=...) stored per row.
+        # 24-hour rows carry no shift seconds (NaN), so both stay zero / False for them as before.
+        total_shift_hours = daily_report['Total Shift Seconds'].to_numpy(dtype=float) / 3600.0
+        more_t_start = daily_report['More_T_Start_Hours'].to_numpy(dtype=float)
+        short_t_threshold = daily_report['Short_T_Threshold_Hours'].to_numpy(dtype=float)
+        more_t_enabled = daily_report['More_T_Enabled'].fillna(False).to_numpy(dtype=bool)
+        with np.errstate(invalid='ignore'):
+            is_more_t = more_t_enabled & (total_shift_hours > more_t_start)
+            is_short_t = (total_shift_hours < short_t_threshold) & (total_shift_hours > 0)
+            more_t_ns = np.where(is_more_t, (total_shift_hours - more_t_start) * 3600 * 1e9, 0.0).astype('int64')
+            short_t_ns = np.where(is_short_t, (short_t_threshold - total_shift_hours) * 3600 * 1e9, 0.0).astype('int64')
+        daily_report['Daily_More_T_Hours'] = format_timedelta_series(pd.Series(more_t_ns.view('timedelta64[ns]'), index=daily_report.index))
+        daily_report['Daily_Short_T_Hours'] = format_timedelta_series(pd.Series(short_t_ns.view('timedelta64[ns]'), index=daily_report.index))
+        daily_report['is_more_t_day'] = more_t_ns > 0
+        daily_report['is_short_t_day'] = short_t_ns > 0
 
         # Calculate and attribute More_T_postMID
         # This calculation uses Original_DateTime for consistency
-        daily_report['Last Punch Time_dt'] = daily_report.apply(
-            lambda row: datetime.strptime(f"{row['Date'].strftime('%Y-%m-%d')} {row['Last Punch Time']}", '%Y-%m-%d %I:%M:%S %p')
-            if row['Last Punch Time'] != 'N/A' else pd.NaT, axis=1
-        )
+        # The shift builders carry the last punch as a Timestamp next to its formatted string
+        daily_report.rename(columns={'Last Punch DT': 'Last Punch Time_dt'}, inplace=True)
         
-        temp_next_day_first_punch = combined_df.copy()
-        # Use Original_DateTime for grouping to find the next day's first punch
-        temp_next_day_first_punch['Date_Original'] = temp_next_day_first_punch['Original_DateTime'].dt.date
-        temp_next_day_first_punch = temp_next_day_first_punch.groupby(['No.', 'Date_Original'])['Original_DateTime'].min().reset_index()
-        temp_next_day_first_punch.rename(columns={'Original_DateTime': 'Next_Day_First_Punch_Time'}, inplace=True)
+        # First punch per employee and *original* calendar day, looked up by (No., next day)
+        first_punch_by_day = combined_df.groupby(
+            [combined_df['No.'], combined_df['Original_DateTime'].dt.date]
+        )['Original_DateTime'].min().to_dict()
 
         daily_report['Next_Day_Date'] = daily_report['Date'] + timedelta(days=1)
         daily_report['No.'] = daily_report['No.'].astype(str)
-
-        daily_report = daily_report.merge(
-            temp_next_day_first_punch,
-            left_on=['No.', 'Next_Day_Date'],
-            right_on=['No.', 'Date_Original'], # Join on the original date of the next day's first punch
-            how='left',
-            suffixes=('', '_next')
+        daily_report['Next_Day_First_Punch_Time'] = pd.Series(
+            [first_punch_by_day.get(key) for key in zip(daily_report['No.'], daily_report['Next_Day_Date'])],
+            index=daily_report.index, dtype='datetime64[ns]'
         )
-        # Fix: Drop 'Date_Original' instead of 'Date_Original_next' as suffixes don't apply here
-        daily_report.drop(columns=['Date_Original'], inplace=True, errors='ignore') 
-
-        daily_report['More_T_postMID_td'] = pd.Timedelta(seconds=0)
-
-        for index, row in daily_report.iterrows():
-            last_punch_time = row['Last Punch Time_dt']
-            next_day_first_punch_time = row['Next_Day_First_Punch_Time']
-            current_report_date = row['Date'] # This is the adjusted report date
 
-            if pd.isna(last_punch_time) or pd.isna(next_day_first_punch_time):
-                continue
-
-            # Check if the next day's first punch is indeed on the next calendar day and within the 00:00-01:00 window
-            # This is based on the *original* calendar time of the punch.
-            if next_day_first_punch_time.date() == (current_report_date + timedelta(days=1)) and \
-               next_day_first_punch_time.hour >= 0 and next_day_first_punch_time.hour < 1:
-                
-                midnight_next_day = datetime.combine(current_report_date + timedelta(days=1), datetime.min.time())
-                duration_post_midnight = next_day_first_punch_time - midnight_next_day
-                daily_report.loc[index, 'More_T_postMID_td'] = duration_post_midnight
+        # Post-midnight time counts only when the next day's first punch is on the next calendar day
+        # and within its 00:00-01:00 window. This is based on the *original* calendar time of the punch.
+        # Plain datetime64 arithmetic against the next day's midnight, computed once for all rows:
+        # on the next day and before 01:00 is 0 <= punch - midnight < 1h; NaT never compares true
+        next_day_first_punch_time = daily_report['Next_Day_First_Punch_Time'].to_numpy(dtype='datetime64[ns]')
+        midnight_next_day = (daily_report['Date'].to_numpy(dtype='datetime64[D]') + np.timedelta64(1, 'D')).astype('datetime64[ns]')
+        duration_post_midnight = next_day_first_punch_time - midnight_next_day
+        is_post_midnight = daily_report['Last Punch Time_dt'].notna().to_numpy() & \
+                           (duration_post_midnight >= np.timedelta64(0, 'ns')) & \
+                           (duration_post_midnight < np.timedelta64(1, 'h'))
+        more_t_post_mid = np.where(is_post_midnight, duration_post_midnight, np.timedelta64(0, 'ns'))
 
         daily_report.drop(columns=['Last Punch Time_dt', 'Next_Day_Date', 'Next_Day_First_Punch_Time'], inplace=True)
-        daily_report['More_T_postMID'] = daily_report['More_T_postMID_td'].apply(format_timedelta_to_hms)
-
-        final_output_df = daily_report.copy()
-        final_output_df['Total Shift Duration_td'] = final_output_df['Total Shift Duration'].apply(lambda x: pd.to_timedelta(x) if isinstance(x, str) else x)
-        final_output_df['Daily_More_T_Hours_td'] = final_output_df['Daily_More_T_Hours'].apply(lambda x: pd.to_timedelta(x) if isinstance(x, str) else x)
-        final_output_df['Daily_Short_T_Hours_td'] = final_output_df['Daily_Short_T_Hours'].apply(lambda x: pd.to_timedelta(x) if isinstance(x, str) else x)
-        final_output_df['More_T_postMID_td'] = final_output_df['More_T_postMID'].apply(lambda x: pd.to_timedelta(x) if isinstance(x, str) else x)
-
-        # Use only fixed_cols for the final column order, ensuring no dynamic interval columns appear
-        final_output_df = final_output_df[fixed_cols].copy()
-        # Ensure Original_DateTime is dropped at the very end from the final output DataFrame
-        final_output_df.drop(columns=['Original_DateTime'], inplace=True, errors='ignore') 
+        daily_report['More_T_postMID'] = format_timedelta_series(pd.Series(more_t_post_mid, index=daily_report.index))
+
+        # Use only the report columns for the final column order; helper columns
+        # (Original_DateTime, thresholds) are left behind by the selection itself
+        final_output_df = daily_report.loc[:, _DAILY_REPORT_COLUMNS].copy()
 
         return final_output_df
 
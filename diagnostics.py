@@ -4,6 +4,25 @@ import streamlit as st
 import pandas as pd
 
 
+def _employee_index(df: pd.DataFrame, id_col: str, cache_key: str) -> dict:
+    """
+    { ID as str : row positions } for df, in first-appearance order.
+    Kept in st.session_state[cache_key] and only rebuilt when a different frame is cached
+    upstream, so reruns and picking another employee are dict lookups.
+    """
+    cached = st.session_state.get(cache_key)
+    if cached is None or cached[0] is not df:
+        cached = (df, df.groupby(df[id_col].astype(str), sort=False).indices)
+        st.session_state[cache_key] = cached
+    return cached[1]
+
+
+def _employee_rows(df: pd.DataFrame, id_col: str, emp_id: str, cache_key: str) -> pd.DataFrame:
+    """Rows of df whose id_col (as str) equals emp_id, same as the boolean-mask filter."""
+    positions = _employee_index(df, id_col, cache_key).get(emp_id)
+    return df.iloc[positions] if positions is not None else df.iloc[0:0]
+
+
 def run_employee_diagnostics():
     """
     Renders an interactive diagnostics panel for investigating
@@ -32,12 +51,15 @@ def run_employee_diagnostics():
         return
 
     # Sidebar Employee selection
-    emp_list = summary_df["No."].astype(str).unique()
+    # The ID list comes from the cached summary index, so it is rebuilt in lockstep with
+    # summary_report_df_cache instead of re-casting the column on every rerun
+    emp_list = list(_employee_index(summary_df, "No.", "diag_summary_rows_cache"))
     emp_id = st.selectbox("Select Employee No.", emp_list)
 
     # Filter data
-    emp_summary = summary_df[summary_df["No."].astype(str) == emp_id].iloc[0]
-    emp_detail = detailed_df[detailed_df["No."].astype(str) == emp_id]
+    emp_summary_rows = _employee_rows(summary_df, "No.", emp_id, "diag_summary_rows_cache")
+    emp_summary = emp_summary_rows.iloc[0]
+    emp_detail = _employee_rows(detailed_df, "No.", emp_id, "diag_detailed_rows_cache")
 
     st.subheader(f"Employee: {emp_summary['Name']} (No. {emp_id})")
 
@@ -71,7 +93,8 @@ def run_employee_diagnostics():
     # ---------------------------------------------------------------------
 
     st.markdown("### 🟦 Raw Daily Punches")
-    st.dataframe(emp_detail)
+    with st.expander("Show raw punches", expanded=False):
+        st.dataframe(emp_detail)
 
     # ---------------------------------------------------------------------
     # SECTION 4 — HR Vacations (Adjusted Absences Per Type)
@@ -79,13 +102,14 @@ def run_employee_diagnostics():
 
     st.markdown("### 🌴 HR Vacation Ranges (From HR_Override)")
 
-    vac_rows = adjusted_df[adjusted_df["id"].astype(str) == emp_id] \
+    vac_rows = _employee_rows(adjusted_df, "id", emp_id, "diag_adjusted_rows_cache") \
         if "id" in adjusted_df.columns else pd.DataFrame()
 
     if vac_rows.empty:
         st.info("No vacation/override entries for this employee.")
     else:
-        st.dataframe(vac_rows)
+        with st.expander("Show vacation entries", expanded=False):
+            st.dataframe(vac_rows)
 
     # ---------------------------------------------------------------------
     # SECTION 5 — Pending OFF credits
@@ -94,8 +118,9 @@ def run_employee_diagnostics():
     st.markdown("### ⏳ Pending OFF Credits")
 
     if not pending_df.empty:
-        emp_pending = pending_df[pending_df["No."].astype(str) == emp_id]
-        st.dataframe(emp_pending)
+        emp_pending = _employee_rows(pending_df, "No.", emp_id, "diag_pending_rows_cache")
+        with st.expander("Show pending OFF credits", expanded=False):
+            st.dataframe(emp_pending)
     else:
         st.info("No pending OFF credits for this employee.")
 
@@ -116,4 +141,5 @@ def run_employee_diagnostics():
     # ---------------------------------------------------------------------
 
     st.markdown("### 📊 Summary Row")
-    st.dataframe(summary_df[summary_df["No."].astype(str) == emp_id])
+    with st.expander("Show summary row", expanded=False):
+        st.dataframe(emp_summary_rows)
@@ -102,18 +102,21 @@ def _aggregate_pending_df(df: pd.DataFrame) -> pd.DataFrame:
         .astype(float) # Keep float for 0.5
     )
 
-    # Extract dates per row
-    def _get_dates(row):
-        dates = []
-        if start_col and pd.notna(row[start_col]):
-            s_dt = pd.to_datetime(row[start_col], errors='coerce')
-            e_dt = pd.to_datetime(row[end_col], errors='coerce') if end_col and pd.notna(row[end_col]) else s_dt
-            if pd.notna(s_dt) and pd.notna(e_dt):
-                # Enumerate range
-                dates = [d.strftime("%Y-%m-%d") for d in pd.date_range(s_dt, e_dt)]
-        return dates
-
-    df["requested_dates"] = df.apply(_get_dates, axis=1)
+    # Extract dates per row: parse each date column once (format='mixed' keeps the per-value
+    # parsing of the old row-wise pd.to_datetime calls), then enumerate each row's range
+    if start_col:
+        start_dts = pd.to_datetime(df[start_col], errors='coerce', format='mixed', cache=True)
+        if end_col:
+            end_dts = pd.to_datetime(df[end_col], errors='coerce', format='mixed', cache=True)
+            end_dts = end_dts.where(df[end_col].notna(), start_dts)
+        else:
+            end_dts = start_dts
+        df["requested_dates"] = [
+            pd.date_range(s_dt, e_dt).strftime("%Y-%m-%d").tolist() if pd.notna(s_dt) and pd.notna(e_dt) else []
+            for s_dt, e_dt in zip(start_dts, end_dts)
+        ]
+    else:
+        df["requested_dates"] = [[] for _ in range(len(df))]
 
     # Aggregate days per employee
     # We sum the count, and union the dates
@@ -1,11 +1,13 @@
+import numpy as np
 import pandas as pd
 from datetime import date, timedelta
 
 from config import (
-    format_timedelta_to_hms,
+    format_timedelta_series,
     get_effective_rules_for_employee_day,
-    get_expected_working_days_in_period,
+    get_expected_working_days_for_periods,
     COMPANY_CONFIGS,
+    Rules,
     normalize_employee_id,
 )
 
@@ -44,7 +46,7 @@ class ReportGenerator:
         - PRESENT day := (Total Shift Duration > 0) OR (any punches >= 1)
           so single-punch and open-shift days are treated as present.
         - Baseline Total_Absent_Days := Expected_Working - Present, clipped to [0].
-        - Expected working days are computed by get_expected_working_days_in_period
+        - Expected working days are computed by get_expected_working_days_for_periods
           using rules from get_effective_rules_for_employee_day (config.py).
         """
 
@@ -165,27 +167,19 @@ class ReportGenerator:
         if effective_dates_map is None:
             effective_dates_map = {}
 
-        for idx, row in summary.iterrows():
-            emp_no = normalize_employee_id(row["No."])
-            src_names = str(row["Source_Names"]) if row["Source_Names"] else ""
+        # Resolve each employee's effective window and rules first, then compute the
+        # expected working days once per distinct rules set for all its employees together
+        eff_start_dates, eff_end_dates, emp_rules = [], [], []
+        for emp_no_raw, src_names in zip(summary["No."], summary["Source_Names"]):
+            emp_no = normalize_employee_id(emp_no_raw)
+            src_names = str(src_names) if src_names else ""
             primary_source = src_names.split(",")[0].strip() if src_names else ""
 
             # Determine Effective Window for this employee
-            # Default to global window
+            # Default to global window (the helper already clips it to the report boundary)
             eff_start_ts, eff_end_ts = effective_dates_map.get(emp_no, (start_dt, end_dt))
-            
-            # Ensure we don't go strictly outside the global report boundary (already clipped in helper, but double check)
-            # Actually helper clips to global.
-            
-            eff_start_date = eff_start_ts.date()
-            eff_end_date = eff_end_ts.date()
-            
-            # Calculate Total Days in Employee's Effective Period
-            # (Used for checking if they were employed at all)
-            emp_total_days = (eff_end_date - eff_start_date).days + 1
-            if emp_total_days <= 0:
-                 # Should not happen if clipped correctly, but handle gracefully
-                 emp_total_days = 0
+            eff_start_dates.append(eff_start_ts.date())
+            eff_end_dates.append(eff_end_ts.date())
 
             try:
                 rules = get_effective_rules_for_employee_day(
@@ -194,32 +188,40 @@ class ReportGenerator:
                     primary_source,
                 )
             except Exception:
-                rules = COMPANY_CONFIGS.get(self.selected_company_name, {}).get(
-                    "default_rules", {}
+                rules = Rules.from_mapping(
+                    COMPANY_CONFIGS.get(self.selected_company_name, {}).get("default_rules", {})
                 )
-
-            expected_work = get_expected_working_days_in_period(
-                eff_start_date,  # Use Employee Effective Start
-                eff_end_date,    # Use Employee Effective End
+            emp_rules.append(rules)
+
+        rows_by_rules = {}
+        for pos, rules in enumerate(emp_rules):
+            rows_by_rules.setdefault(rules, []).append(pos)
+
+        eff_start_dates = np.array(eff_start_dates, dtype="datetime64[D]")
+        eff_end_dates = np.array(eff_end_dates, dtype="datetime64[D]")
+        expected_work = np.zeros(len(summary), dtype=float)
+        for rules, positions in rows_by_rules.items():
+            expected_work[positions] = get_expected_working_days_for_periods(
+                eff_start_dates[positions],  # Use Employee Effective Start
+                eff_end_dates[positions],    # Use Employee Effective End
                 rules,
             )
 
-            # Total Offs calculation:
-            # Should be based on employee's period total days, NOT global total days.
-            # User: "we calculate the weekends for new hiring as per their specific period"
-            total_offs = float(emp_total_days) - float(expected_work)
+        # Total Days in Employee's Effective Period (used for checking if they were employed at all)
+        emp_total_days = np.maximum((eff_end_dates - eff_start_dates).astype(np.int64) + 1, 0)
 
-            summary.at[idx, "Total_Expected_Working_Days_In_Period"] = float(expected_work)
-            summary.at[idx, "Total_Employee_Period_OFFs"] = max(total_offs, 0.0)
+        # Total Offs calculation:
+        # Should be based on employee's period total days, NOT global total days.
+        # User: "we calculate the weekends for new hiring as per their specific period"
+        total_offs = np.maximum(emp_total_days - expected_work, 0.0)
+        is_rotational = np.array([rules.is_rotational_off for rules in emp_rules], dtype=bool)
+        rot_per_week = np.array([float(rules.rotational_days_off_per_week or 1) for rules in emp_rules])
 
-            if rules.get("is_rotational_off", False):
-                summary.at[idx, "Expected_Rotational_Offs"] = max(total_offs, 0.0)
-                rot_per_week = rules.get("rotational_days_off_per_week", 1) or 1
-                summary.at[idx, "Rotational_Off_Weeks"] = (
-                    max(total_offs, 0.0) / float(rot_per_week)
-                )
-            else:
-                summary.at[idx, "Expected_Weekends_In_Period"] = max(total_offs, 0.0)
+        summary["Total_Expected_Working_Days_In_Period"] = expected_work
+        summary["Total_Employee_Period_OFFs"] = total_offs
+        summary["Expected_Rotational_Offs"] = np.where(is_rotational, total_offs, 0.0)
+        summary["Rotational_Off_Weeks"] = np.where(is_rotational, total_offs / rot_per_week, 0.0)
+        summary["Expected_Weekends_In_Period"] = np.where(is_rotational, 0.0, total_offs)
 
         # --- baseline Total_Absent_Days (float, then coerced to int if whole report) ---
         summary["Total_Absent_Days"] = (
@@ -249,18 +251,10 @@ class ReportGenerator:
             summary["Total_Shift_Durations_td"].dt.total_seconds() / 3600.0
         ).round(2)
 
-        summary["Total_Shift_Duration"] = summary["Total_Shift_Durations_td"].apply(
-            format_timedelta_to_hms
-        )
-        summary["Total_More_T_Hours"] = summary["Total_More_T_Hours_td"].apply(
-            format_timedelta_to_hms
-        )
-        summary["Total_Short_T_Hours"] = summary["Total_Short_T_Hours_td"].apply(
-            format_timedelta_to_hms
-        )
-        summary["Total_More_T_postMID"] = summary["Total_More_T_postMID_td"].apply(
-            format_timedelta_to_hms
-        )
+        summary["Total_Shift_Duration"] = format_timedelta_series(summary["Total_Shift_Durations_td"])
+        summary["Total_More_T_Hours"] = format_timedelta_series(summary["Total_More_T_Hours_td"])
+        summary["Total_Short_T_Hours"] = format_timedelta_series(summary["Total_Short_T_Hours_td"])
+        summary["Total_More_T_postMID"] = format_timedelta_series(summary["Total_More_T_postMID_td"])
 
         summary.drop(
             columns=[
@@ -275,8 +269,8 @@ class ReportGenerator:
         # ------------------------------------------------------------------
         # NEW BLOCK: Baseline Absent_Dates using _enumerate_absent_dates()
         # ------------------------------------------------------------------
-        # Initialize column as list-of-lists
-        summary["Absent_Dates"] = [[] for _ in range(len(summary))]
+        # Collected per row and assigned as whole columns after the loop
+        absent_dates_per_row = []
 
         for idx, row in summary.iterrows():
             emp_no = normalize_employee_id(row["No."])
@@ -291,11 +285,11 @@ class ReportGenerator:
                     primary_source,
                 )
             except Exception:
-                rules = COMPANY_CONFIGS.get(self.selected_company_name, {}).get(
-                    "default_rules", {}
+                rules = Rules.from_mapping(
+                    COMPANY_CONFIGS.get(self.selected_company_name, {}).get("default_rules", {})
                 )
 
-            weekend_days = rules.get("weekend_days", [])
+            weekend_days = rules.weekend_days
             # Build employee-specific daily frame
             emp_df = window_df[window_df["No."].astype(str) == emp_no].copy()
 
@@ -313,8 +307,10 @@ class ReportGenerator:
                 weekend_days=weekend_days,
             )
 
-            summary.at[idx, "Absent_Dates"] = absent_dates_list
-            summary.at[idx, "Total_Absent_Days"] = len(absent_dates_list)
+            absent_dates_per_row.append(absent_dates_list)
+
+        summary["Absent_Dates"] = pd.Series(absent_dates_per_row, index=summary.index, dtype=object)
+        summary["Total_Absent_Days"] = [len(dates) for dates in absent_dates_per_row]
 
         return summary
 
@@ -349,7 +345,7 @@ class ReportGenerator:
         import streamlit as st
         import ast
         import pandas as pd
-        from config import COMPANY_CONFIGS, get_effective_rules_for_employee_day
+        from config import COMPANY_CONFIGS, Rules, get_effective_rules_for_employee_day
 
 
         # ------------------------------------------------------------------
@@ -515,8 +511,8 @@ class ReportGenerator:
             try:
                 rules = get_effective_rules_for_employee_day(self.selected_company_name, emp, primary)
             except:
-                rules = COMPANY_CONFIGS.get(self.selected_company_name, {}).get("default_rules", {})
-            week_set = set(int(x) for x in rules.get("weekend_days", []) if x is not None)
+                rules = Rules.from_mapping(COMPANY_CONFIGS.get(self.selected_company_name, {}).get("default_rules", {}))
+            week_set = set(int(x) for x in rules.weekend_days if x is not None)
 
             # parse authoritative lists
             absent_before = set(pd.to_datetime(d, errors="coerce").date()
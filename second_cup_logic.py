@@ -98,6 +98,7 @@ def calculate_24_hour_shifts(emp_group_full_sorted: pd.DataFrame, emp_no: str, s
                             "Number of Cleaned Punches": 2,
                             "First Punch Time": rec["Original_DateTime"].strftime("%I:%M:%S %p"),
                             "Last Punch Time": end_record["Original_DateTime"].strftime("%I:%M:%S %p"),
+                            "Last Punch DT": end_record["Original_DateTime"],
                             "Total Shift Duration": format_timedelta_to_hms(dur),
                             "Punch Status": "Paired C/In–C/Out Shift (24hr Logic)",
                             "Status_Autofixed": rec.get("Status_Autofixed", False),
@@ -124,6 +125,7 @@ def calculate_24_hour_shifts(emp_group_full_sorted: pd.DataFrame, emp_no: str, s
                     "Number of Cleaned Punches": 1,
                     "First Punch Time": rec["Original_DateTime"].strftime("%I:%M:%S %p"),
                     "Last Punch Time": rec["Original_DateTime"].strftime("%I:%M:%S %p"),
+                    "Last Punch DT": rec["Original_DateTime"],
                     "Total Shift Duration": "00:00:00",
                     "Punch Status": "Single Punch (Present, 24hr Logic)",
                     "Status_Autofixed": rec.get("Status_Autofixed", False),
@@ -146,6 +148,7 @@ def calculate_24_hour_shifts(emp_group_full_sorted: pd.DataFrame, emp_no: str, s
                 "Number of Cleaned Punches": 1,
                 "First Punch Time": rec["Original_DateTime"].strftime("%I:%M:%S %p"),
                 "Last Punch Time": rec["Original_DateTime"].strftime("%I:%M:%S %p"),
+                "Last Punch DT": rec["Original_DateTime"],
                 "Total Shift Duration": "00:00:00",
                 "Punch Status": "Single C/Out Punch (Present, 24hr Logic)",
                 "Status_Autofixed": rec.get("Status_Autofixed", False),
@@ -1,18 +1,101 @@
 import pandas as pd
 import requests
 import io
+import json
 import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from config import normalize_employee_id
+from requests.adapters import HTTPAdapter
+from config import normalize_employee_id, sheet_export_url, STORE_OPS_LINKS
 
-def fetch_store_ops_from_url(url: str) -> pd.DataFrame:
+# Local copies of downloaded sheets, revalidated with the server's ETag / Last-Modified.
+# Next to this module, so the cache does not depend on the directory the app is started from.
+SHEET_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".sheet_cache")
+
+# One pooled session shared by every download so connections and TLS sessions are reused
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(pool_connections=32, pool_maxsize=32))
+SHEET_FETCH_WORKERS = 16
+
+def _replace_file(path: str, text: str):
+    """
+    Writes `text` to a temporary file beside `path`, then renames it over `path`, so readers
+    (and other sessions writing the same sheet) only ever see a complete file.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+def fetch_sheet_csv(spreadsheet_id: str, gid=None) -> str:
+    """
+    Downloads a Google Sheet as CSV text.
+    A copy is kept in SHEET_CACHE_DIR and revalidated with If-None-Match /
+    If-Modified-Since, so an unchanged sheet costs a 304 instead of a full download.
+    """
+    cache_key = spreadsheet_id if gid is None else f"{spreadsheet_id}_{gid}"
+    csv_path = os.path.join(SHEET_CACHE_DIR, f"{cache_key}.csv")
+    meta_path = os.path.join(SHEET_CACHE_DIR, f"{cache_key}.meta")
+
+    headers = {}
+    if os.path.exists(csv_path) and os.path.exists(meta_path):
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        except (OSError, ValueError):
+            headers = {}
+
+    response = SESSION.get(sheet_export_url(spreadsheet_id, gid), headers=headers)
+    if response.status_code == 304:
+        with open(csv_path, encoding="utf-8") as f:
+            return f.read()
+    response.raise_for_status()
+
+    try:
+        os.makedirs(SHEET_CACHE_DIR, exist_ok=True)
+        # The validators are dropped before the CSV is replaced and written back last, so an
+        # interrupted write can never leave an ETag that would revalidate a stale or partial CSV
+        try:
+            os.remove(meta_path)
+        except FileNotFoundError:
+            pass
+        _replace_file(csv_path, response.text)
+        _replace_file(meta_path, json.dumps({
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }))
+    except OSError as e:
+        logging.warning(f"Could not cache sheet {cache_key}: {e}")
+
+    return response.text
+
+def read_sheet_csv(csv_text: str) -> pd.DataFrame:
+    """
+    Parses downloaded sheet CSV text with no header row.
+    Kept on the default C parser: the sheets are small, and the grid is located by cell
+    contents, which pyarrow's per-column type inference and blank-cell handling would change.
+    """
+    return pd.read_csv(io.StringIO(csv_text), header=None)
+
+def fetch_store_ops(spreadsheet_id: str, gid=None) -> pd.DataFrame:
     """
     Fetches the Google Sheet data as CSV.
     """
     try:
-        response = requests.get(url)
-        response.raise_for_status()
-        df_raw = pd.read_csv(io.StringIO(response.text), header=None)
+        df_raw = read_sheet_csv(fetch_sheet_csv(spreadsheet_id, gid))
         
         # 0. Extract Year from the first few rows (e.g. '25-Mar-2026')
         year_str = ""
@@ -78,9 +161,23 @@ def fetch_store_ops_from_url(url: str) -> pd.DataFrame:
         
         return df
     except Exception as e:
-        logging.error(f"Error fetching store ops from URL: {e}")
+        logging.error(f"Error fetching store ops sheet {spreadsheet_id}: {e}")
         return pd.DataFrame()
 
+def fetch_all_sheets(names) -> dict:
+    """
+    Fetches the store ops sheets of several locations concurrently.
+    Returns { location name : DataFrame }; names without a link are skipped.
+    Locations that share a spreadsheet are downloaded once and share the parsed frame.
+    """
+    names = [n for n in names if n in STORE_OPS_LINKS]
+    links = list(dict.fromkeys(STORE_OPS_LINKS[n] for n in names))
+    if not links:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(SHEET_FETCH_WORKERS, len(links))) as ex:
+        sheets = dict(zip(links, ex.map(lambda link: fetch_store_ops(*link), links)))
+    return {n: sheets[STORE_OPS_LINKS[n]] for n in names}
+
 def compare_criteria_with_actual(criteria_df: pd.DataFrame, detailed_df: pd.DataFrame) -> dict:
     """
     Compares the store operations criteria with actual fingerprint data.
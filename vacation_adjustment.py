@@ -172,31 +172,15 @@ def _enumerate_absent_dates(
     # -------------------------------------------------------
     # 6. Build ABSENT list
     # -------------------------------------------------------
-    weekend_days_set = set(weekend_days) if weekend_days else set()
-
-    absent = []
-    for idx, d in enumerate(all_days_norm):
-
-        weekday = d.weekday()
-
-        # Weekend?
-        if weekday in weekend_days_set:
-            continue
-
-        # Vacation?
-        if d in vac_days:
-            continue
-
-        # Present?
-        if d in present_dates:
-            continue
-
-        absent.append(d)
+    # Weekend / vacation / presence are classified for the whole range at once
+    is_weekend = all_days_norm.weekday.isin(list(weekend_days) if weekend_days else [])
+    is_absent = ~(is_weekend | all_days_norm.isin(vac_days) | all_days_norm.isin(present_dates))
+    absent = all_days_norm[is_absent]
 
     # -------------------------------------------------------
     # 7. Output formatting
     # -------------------------------------------------------
-    return [d.strftime("%Y-%m-%d") for d in sorted(absent)]
+    return list(absent.sort_values().strftime("%Y-%m-%d"))
 
 
 
@@ -490,7 +474,7 @@ def load_vacation_file(uploaded_file) -> pd.DataFrame:
             df[id_col] = df[id_col].apply(normalize_employee_id)
             # Remove total rows or empty IDs
             df = df[df[id_col].str.lower() != 'nan']
-            df = df[~df[id_col].str.lower().str.contains('total', na=False)]
+            df = df[~df[id_col].str.lower().str.contains('total', na=False, regex=False)]
 
             extracted = pd.DataFrame()
             extracted['id'] = df[id_col]